@@ -27,11 +27,28 @@ bl_info = {
 }
 
 import bpy
+import bmesh
 import os
+import csv
+import json
+import struct
 import bpy.utils.previews
+from bpy.app.handlers import persistent
+from bpy_extras.io_utils import ExportHelper
+from bisect import bisect_left
+from itertools import chain
+from operator import attrgetter
+from time import localtime, perf_counter, strftime, time
 from enum import Enum
 
+# NumPy ships with Blender, the pure Python fallback is for other interpreters
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 # Constant limitation values just in case they are altered.
+# The ranks are normally read from profiles/vrchat.json, these are the fallback.
 VRC_ANDROID_TRIS_EXCELLENT = 7500
 VRC_ANDROID_TRIS_GOOD = 10000
 VRC_ANDROID_TRIS_MEDIUM = 15000
@@ -74,6 +91,30 @@ VRC_PC_BONES_GOOD = 150
 VRC_PC_BONES_MEDIUM = 256
 VRC_PC_BONES_POOR = 400
 
+# Texture memory limits are in MB
+VRC_ANDROID_TEXTURE_MEMORY_EXCELLENT = 10
+VRC_ANDROID_TEXTURE_MEMORY_GOOD = 18
+VRC_ANDROID_TEXTURE_MEMORY_MEDIUM = 25
+VRC_ANDROID_TEXTURE_MEMORY_POOR = 40
+
+VRC_PC_TEXTURE_MEMORY_EXCELLENT = 40
+VRC_PC_TEXTURE_MEMORY_GOOD = 75
+VRC_PC_TEXTURE_MEMORY_MEDIUM = 110
+VRC_PC_TEXTURE_MEMORY_POOR = 150
+
+BYTES_PER_MB = 1024 * 1024
+
+# Block compressed formats the textures are assumed to end up in after import,
+# as (block width, block height, bytes per block)
+TEXTURE_FORMATS = {
+    "DXT1": (4, 4, 8),
+    "DXT5": (4, 4, 16),
+    "BC7": (4, 4, 16),
+    "ASTC_4x4": (4, 4, 16),
+    "ASTC_6x6": (6, 6, 16),
+    "ASTC_8x8": (8, 8, 16),
+}
+
 class ValueType(Enum):
     # Enum for the types we poll for readability
 
@@ -82,6 +123,28 @@ class ValueType(Enum):
     BASIC_MESH = "Basic Mesh"
     MATERIALS = "Materials"
     BONES = "Bones"
+    TEXTURE_MEMORY = "Texture Memory"
+
+class Rank(Enum):
+    # VRChat performance ranks, best to worst
+
+    EXCELLENT = "Excellent"
+    GOOD = "Good"
+    MEDIUM = "Medium"
+    POOR = "Poor"
+    VERY_POOR = "Very Poor"
+
+# Position of each rank from best to worst, for comparing ranks
+RANK_SEVERITY = {rank: index for index, rank in enumerate(Rank)}
+
+# Preview collection key of the icon for each rank
+RANK_ICONS = {
+    Rank.EXCELLENT: "vrc_excellent",
+    Rank.GOOD: "vrc_good",
+    Rank.MEDIUM: "vrc_medium",
+    Rank.POOR: "vrc_poor",
+    Rank.VERY_POOR: "vrc_verypoor",
+}
 
 class MeasuredStats:
     total_tri_count = 0
@@ -89,14 +152,105 @@ class MeasuredStats:
     bone_count = 0
     skinned_mesh = 0
     basic_mesh = 0
+    # Estimated texture memory in bytes, the compression differs per platform
+    texture_bytes_pc = 0
+    texture_bytes_mobile = 0
+
+    def __init__(self, analyze_bones=False):
+        # Images already counted, a texture used by several materials is only loaded once
+        self.image_keys = set()
+        # Names of bones no vertex is weighted to, None unless the bones are analyzed
+        self.unused_bones = [] if analyze_bones else None
+
+    def copy(self):
+        other = MeasuredStats()
+        for field in MEASURED_STATS_FIELDS.values():
+            setattr(other, field, getattr(self, field))
+        other.texture_bytes_pc = self.texture_bytes_pc
+        other.texture_bytes_mobile = self.texture_bytes_mobile
+        return other
+
+    def get(self, value_type: ValueType, is_mobile=False):
+        if value_type is ValueType.TEXTURE_MEMORY:
+            return (self.texture_bytes_mobile if is_mobile else self.texture_bytes_pc) / BYTES_PER_MB
+        return getattr(self, MEASURED_STATS_FIELDS[value_type])
+
+# MeasuredStats attribute holding the value of each ValueType
+MEASURED_STATS_FIELDS = {
+    ValueType.TRIS: "total_tri_count",
+    ValueType.SKINNED_MESH: "skinned_mesh",
+    ValueType.BASIC_MESH: "basic_mesh",
+    ValueType.MATERIALS: "total_mat_count",
+    ValueType.BONES: "bone_count",
+}
+
+# ValueTypes whose value depends on the platform, see MeasuredStats.get
+PLATFORM_VALUE_TYPES = {ValueType.TEXTURE_MEMORY}
+
+class StageTiming:
+    __slots__ = ("calls", "total", "last", "worst")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.worst = 0.0
+
+
+class PerfStats:
+    # Timings and counters of the draw path for the Performance Debug panel.
+    # Every call site checks `enabled` first, so nothing is measured or allocated while it's off.
+
+    STAGES = ("Selection", "Traversal", "Counting", "Ranking", "Drawing")
+
+    def __init__(self):
+        self.enabled = False
+        self.timings = {}
+        self.counters = {}
+
+    def reset(self):
+        self.timings.clear()
+        self.counters.clear()
+
+    def add_time(self, stage, start):
+        elapsed = perf_counter() - start
+        timing = self.timings.get(stage)
+        if timing is None:
+            timing = self.timings[stage] = StageTiming()
+        timing.calls += 1
+        timing.total += elapsed
+        timing.last = elapsed
+        timing.worst = max(timing.worst, elapsed)
+
+    def count(self, counter, amount=1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def get_report(self):
+        lines = [f"{'Stage':<12}{'Calls':>8}{'Last ms':>10}{'Avg ms':>10}{'Max ms':>10}"]
+        for stage in self.STAGES:
+            timing = self.timings.get(stage)
+            if timing is None:
+                continue
+            lines.append(
+                f"{stage:<12}{timing.calls:>8}{timing.last * 1000:>10.3f}"
+                f"{timing.total / timing.calls * 1000:>10.3f}{timing.worst * 1000:>10.3f}"
+            )
+        for counter, amount in sorted(self.counters.items()):
+            lines.append(f"{counter}: {amount}")
+        return lines
+
+
+perf_stats = PerfStats()
+
 
 class VRCGlobalFunctions:
 
     # Draw the UI with the numbers right aligned
     @staticmethod
-    def draw_labeled_row(layout, label, value, value_type, is_mobile=False, factor=0.4, selected_value=None):
-        max_value = ValueProvider.get_value(value_type, value, is_mobile)
-        icon = IconProvider.get_icon(value_type, value, is_mobile)
+    def draw_labeled_row(layout, label, value, step, factor=0.4, selected_value=None, unit=""):
+        # step is the RankStep of the value, see RankResult
+        max_value = step.limit
+        icon = step.icon_id
 
         row = layout.row(align=True)
         split = row.split(factor=factor)
@@ -107,69 +261,148 @@ class VRCGlobalFunctions:
         right = split.row(align=True)
         right.alignment = 'RIGHT'
 
+        if isinstance(value, float):
+            value = f"{value:.2f}"
+
         # Display selected values if selected or not
         if selected_value is not None:
-            right.label(text=f"{value}/{max_value} ({selected_value})")
+            right.label(text=f"{value}/{max_value}{unit} ({selected_value})")
         else:
-            right.label(text=f"{value}/{max_value}")
+            right.label(text=f"{value}/{max_value}{unit}")
 
     @staticmethod
-    def walk_children(obj, measured_stats, is_collection):
+    def walk_children(obj, measured_stats, is_collection, depsgraph=None):
+        for element in VRCGlobalFunctions.iter_objects(obj, is_collection):
+            VRCGlobalFunctions.get_stats_for_object(element, measured_stats, depsgraph)
+
+    @staticmethod
+    def iter_objects(obj, is_collection):
         if is_collection:
-            for child in obj.objects:
-                VRCGlobalFunctions.get_stats_for_object(child, measured_stats)
+            # Everything in the collection and its child collections
+            objects = collection_index.get_objects(obj)
         else:
-            for element in obj:
-                VRCGlobalFunctions.get_stats_for_object(element, measured_stats)
-                for child in element.children_recursive:
-                    VRCGlobalFunctions.get_stats_for_object(child, measured_stats)
+            # Selected objects and their children, each counted once even if a parent
+            # and its child are both selected
+            objects = hierarchy_index.walk(obj)
+        return VRCGlobalFunctions.filter_counted(objects)
+
+    @staticmethod
+    def filter_counted(objects):
+        # Leave out hidden, disabled and excluded objects unless the settings count them
+        settings = get_settings()
+        if settings is None or settings.count_hidden:
+            return iter(objects)
+        return (element for element in objects if element.visible_get())
 
     @staticmethod
-    def get_stats_for_object(obj, measured_stats):
+    def get_stats_for_object(obj, measured_stats, depsgraph=None):
         if isinstance(obj, bpy.types.Collection):
             # it's a collection, there are no stats to calculate for collections,
             # and they don't have the field "type", so exit early
             return
         elif obj.type == "MESH":
-            tri_count, mat_count = VRCGlobalFunctions.get_materials_and_tris_from_mesh(obj)
+            tri_count, mat_count, is_skinned = mesh_stat_index.get(obj, depsgraph)
             measured_stats.total_tri_count += tri_count
             measured_stats.total_mat_count += mat_count
-            if any(mod.type == "ARMATURE" for mod in obj.modifiers) or \
-        (obj.data.shape_keys is not None and len(obj.data.shape_keys.key_blocks) > 1):
+            if is_skinned:
                 measured_stats.skinned_mesh += 1
             else:
                 measured_stats.basic_mesh += 1
+            texture_memory_index.add_object(obj, measured_stats)
         elif obj.type == "ARMATURE":
             measured_stats.bone_count += len(obj.data.bones)
+            if measured_stats.unused_bones is not None:
+                measured_stats.unused_bones.extend(bone_usage_index.get_unused_bones(obj))
+
+    @staticmethod
+    def get_node_tree_images(node_tree, images, visited_trees):
+        # Collect the images of every image texture node, including those inside node groups
+        for node in node_tree.nodes:
+            if node.type in ("TEX_IMAGE", "TEX_ENVIRONMENT"):
+                if node.image is not None:
+                    images[get_id_key(node.image)] = node.image
+            elif node.type == "GROUP" and node.node_tree is not None:
+                tree_key = get_id_key(node.node_tree)
+                if tree_key not in visited_trees:
+                    visited_trees.add(tree_key)
+                    VRCGlobalFunctions.get_node_tree_images(node.node_tree, images, visited_trees)
+
+    @staticmethod
+    def get_texture_bytes(width, height, texture_format):
+        # GPU memory of a block compressed texture with its full mip chain
+        block_width, block_height, block_bytes = TEXTURE_FORMATS[texture_format]
+        if width <= 0 or height <= 0:
+            return 0
+        total = 0
+        while True:
+            total += -(-width // block_width) * -(-height // block_height) * block_bytes
+            if width == 1 and height == 1:
+                return total
+            width = max(1, width // 2)
+            height = max(1, height // 2)
+
+    @staticmethod
+    def has_deform_modifiers_only(obj):
+        # True without modifiers too. Posing sends a geometry update for every skinned
+        # mesh, evaluating those would call to_mesh on each of them every frame.
+        return all(mod.type in DEFORM_MODIFIER_TYPES for mod in obj.modifiers)
+
+    @staticmethod
+    def is_skinned_mesh(obj):
+        return any(mod.type == "ARMATURE" for mod in obj.modifiers) or \
+            (obj.data.shape_keys is not None and len(obj.data.shape_keys.key_blocks) > 1)
 
     @staticmethod
     def get_selected():
         if len(bpy.context.selected_objects) == 0 and bpy.context.view_layer.active_layer_collection is not None:
-            print("Collection selected.")
             return bpy.context.view_layer.active_layer_collection.collection, True
         elif len(bpy.context.selected_objects) > 0:
-            # FIXME: bpy.context.selected_objects doesn't include disabled objects.
-            #  I don't see any easy way to get all the objects, so this will have to do. Current upstream has the same limitation.
-            print("Objects selected.", bpy.context.selected_objects)
+            # Disabled objects can't be selected, but hidden children of the selection are
+            # still reached through the hierarchy index, see iter_objects
             return bpy.context.selected_objects, False
         else:
-            print("No object selected.")
             return None, None
 
     @staticmethod
     def get_materials_and_tris_from_mesh(mesh):
         # Count of tris and mats on the selected mesh
-        tri_count = sum(len(p.vertices) - 2 for p in mesh.data.polygons)
+        tri_count = VRCGlobalFunctions.get_tri_count(mesh.data)
         mat_count = len(mesh.material_slots)
 
         return tri_count, mat_count
 
+    @staticmethod
+    def get_tri_count(mesh_data):
+        # An n-gon triangulates into (n - 2) tris, so the sum over all polygons is
+        # simply the loop total minus two per polygon. Both lengths are stored on the
+        # mesh, so this never touches the individual polygons.
+        return len(mesh_data.loops) - 2 * len(mesh_data.polygons)
+
+    @staticmethod
+    def get_bmesh_tri_count(bm):
+        # Same closed form as get_tri_count, but a BMesh has no loop total to read,
+        # so the face sizes have to be summed
+        return sum(len(face.verts) for face in bm.faces) - 2 * len(bm.faces)
+
+    @staticmethod
+    def get_evaluated_tri_count(obj, depsgraph):
+        # Tris after modifiers (Decimate, Mirror, Subdivision...), matching what gets exported
+        obj_eval = obj.evaluated_get(depsgraph)
+        mesh_eval = obj_eval.to_mesh()
+        try:
+            return VRCGlobalFunctions.get_tri_count(mesh_eval) if mesh_eval is not None else 0
+        finally:
+            obj_eval.to_mesh_clear()
+
     @staticmethod
     def get_icon_and_name_for_selection():
 
         # Get the currently selected object
         obj, is_collection = VRCGlobalFunctions.get_selected()
+        return VRCGlobalFunctions.get_icon_and_name(obj, is_collection)
 
+    @staticmethod
+    def get_icon_and_name(obj, is_collection):
         if obj:
             # Retrieve the object's name
             # object_name = obj.name
@@ -196,53 +429,1555 @@ class VRCGlobalFunctions:
                 object_name = obj[0].name
                 icon = "OUTLINER_OB_EMPTY"
 
-            print(f"Object Name: {object_name}")
-            print(f"Object Icon: {icon}")
             return icon, object_name
         else:
-            print("No object selected.")
             return None, None
 
     @staticmethod
     def draw_perf_labels(
             layout,
             measured_stats: MeasuredStats,
-            is_mobile=False):
+            rank_result,
+            is_mobile=False,
+            icon=None,
+            object_name=None):
 
-        icon, object_name = VRCGlobalFunctions.get_icon_and_name_for_selection()
+        if object_name is None:
+            icon, object_name = VRCGlobalFunctions.get_icon_and_name_for_selection()
         # Drawing UI
         layout.label(text=f"{object_name}", icon=icon)
+        worst = rank_result.get_worst(is_mobile)
+        layout.label(text=f"Overall: {worst.rank.value}", icon_value=worst.icon_id)
         if measured_stats.skinned_mesh > 0:
-            VRCGlobalFunctions.draw_labeled_row(layout, "Skinned Mesh:", measured_stats.skinned_mesh, ValueType.SKINNED_MESH, is_mobile, 0.8)
+            VRCGlobalFunctions.draw_labeled_row(layout, "Skinned Mesh:", measured_stats.skinned_mesh, rank_result.get_step(ValueType.SKINNED_MESH, is_mobile), 0.8)
         if measured_stats.basic_mesh > 0:
-            VRCGlobalFunctions.draw_labeled_row(layout, "Basic Mesh:", measured_stats.basic_mesh, ValueType.BASIC_MESH, is_mobile, 0.8)
+            VRCGlobalFunctions.draw_labeled_row(layout, "Basic Mesh:", measured_stats.basic_mesh, rank_result.get_step(ValueType.BASIC_MESH, is_mobile), 0.8)
         if measured_stats.total_tri_count > 0:
-            VRCGlobalFunctions.draw_labeled_row(layout, "Tris:", measured_stats.total_tri_count, ValueType.TRIS, is_mobile, 0.3, measured_stats.total_tri_count)
+            VRCGlobalFunctions.draw_labeled_row(layout, "Tris:", measured_stats.total_tri_count, rank_result.get_step(ValueType.TRIS, is_mobile), 0.3, measured_stats.total_tri_count)
         if measured_stats.total_mat_count > 0:
-            VRCGlobalFunctions.draw_labeled_row(layout, "Materials:", measured_stats.total_mat_count, ValueType.MATERIALS, is_mobile, 0.6, measured_stats.total_mat_count)
+            VRCGlobalFunctions.draw_labeled_row(layout, "Materials:", measured_stats.total_mat_count, rank_result.get_step(ValueType.MATERIALS, is_mobile), 0.6, measured_stats.total_mat_count)
         if measured_stats.bone_count > 0:
-            VRCGlobalFunctions.draw_labeled_row(layout, "Bones:", measured_stats.bone_count, ValueType.BONES, is_mobile, 0.5)
+            VRCGlobalFunctions.draw_labeled_row(layout, "Bones:", measured_stats.bone_count, rank_result.get_step(ValueType.BONES, is_mobile), 0.5)
+            if rank_result.used_bone_steps is not None:
+                used_bones = measured_stats.bone_count - len(measured_stats.unused_bones)
+                VRCGlobalFunctions.draw_labeled_row(layout, "Used Bones:", used_bones, rank_result.used_bone_steps[is_mobile], 0.5)
+        if measured_stats.texture_bytes_pc > 0:
+            texture_memory = rank_result.get_value(ValueType.TEXTURE_MEMORY, is_mobile)
+            VRCGlobalFunctions.draw_labeled_row(layout, "Texture Memory:", texture_memory, rank_result.get_step(ValueType.TEXTURE_MEMORY, is_mobile), 0.45, unit=" MB")
 
     @staticmethod
-    def determine_draw_path(layout, is_mobile):
-        obj, is_collection = VRCGlobalFunctions.get_selected()
-        global custom_icons
+    def collect_stats(obj, is_collection, depsgraph=None, analyze_bones=False):
+        # Walk the selection once and return the totals for it.
+        # Pass a depsgraph to count tris after modifiers.
+        measured_stats = MeasuredStats(analyze_bones)
+        roots = VRCGlobalFunctions.get_walk_roots(obj, is_collection)
+        VRCGlobalFunctions.walk_children(roots, measured_stats, is_collection, depsgraph)
+        return measured_stats
+
+    @staticmethod
+    def find_avatar_roots(objects):
+        # Armatures that are not parented under another armature, in a single pass
+        roots = []
+        for obj in objects:
+            if obj.type != "ARMATURE":
+                continue
+            parent = obj.parent
+            while parent is not None and parent.type != "ARMATURE":
+                parent = parent.parent
+            if parent is None:
+                roots.append(obj)
+        return roots
 
-        measured_stats = MeasuredStats()
+    @staticmethod
+    def get_walk_roots(obj, is_collection):
+        # A single mesh of an armature shows the stats of the whole armature
+        if not is_collection and len(obj) == 1 and obj[0].parent is not None and obj[0].parent.type == "ARMATURE":
+            return [obj[0].parent]
+        return obj
 
+    @staticmethod
+    def get_selection_key(obj, is_collection):
+        # Cheap identity of the current selection, used to tell if the cached stats still apply
+        if obj is None:
+            return None
         if is_collection:
-            VRCGlobalFunctions.walk_children(obj, measured_stats, is_collection)
-            VRCGlobalFunctions.draw_perf_labels(layout, measured_stats, is_mobile)
-            return
-        if len(obj) == 1 and obj[0].parent is not None and obj[0].parent.type == "ARMATURE":
-            VRCGlobalFunctions.walk_children(obj.parent, measured_stats, is_collection)
-            VRCGlobalFunctions.draw_perf_labels(layout, measured_stats, is_mobile)
+            return True, obj.name_full
+        return False, tuple(element.name_full for element in obj)
+
+    @staticmethod
+    def determine_draw_path(layout, is_mobile):
+        cached = stats_cache.get()
+
+        if cached.measured_stats is None or cached.rank_result is None:
             return
+
+        if perf_stats.enabled:
+            start = perf_counter()
+
+        if cached.job is not None:
+            VRCGlobalFunctions.draw_progress(layout, cached.job.get_progress())
+
+        VRCGlobalFunctions.draw_perf_labels(layout, cached.measured_stats, cached.rank_result, is_mobile, cached.icon, cached.object_name)
+
+        if perf_stats.enabled:
+            perf_stats.add_time("Drawing", start)
+
+    @staticmethod
+    def draw_progress(layout, progress):
+        text = f"Counting... {progress:.0%}"
+        # UILayout.progress only exists since Blender 4.0
+        if hasattr(layout, "progress"):
+            layout.progress(factor=progress, type="BAR", text=text)
         else:
-            VRCGlobalFunctions.walk_children(obj, measured_stats, is_collection)
-            VRCGlobalFunctions.draw_perf_labels(layout, measured_stats, is_mobile)
+            layout.label(text=text, icon="TIME")
+
+
+class StatsCache:
+    # Keeps the stats of the current selection between redraws.
+    # Both panels read from here; the stats are only recomputed after the
+    # handlers below mark them dirty or the selection changes.
+
+    def __init__(self):
+        self.measured_stats = None
+        # Ranks of measured_stats, see RankResult
+        self.rank_result = None
+        self.selection_key = None
+        self.icon = None
+        self.object_name = None
+        self.dirty = True
+        # Progressive pass in flight for large selections, see StatsJob
+        self.job = None
+        # Objects counted for the current stats, and a counter bumped on every recount
+        self.objects = []
+        self.version = 0
+
+    def invalidate(self):
+        self.dirty = True
+
+    def clear(self):
+        self.cancel_job()
+        self.measured_stats = None
+        self.rank_result = None
+        self.selection_key = None
+        self.dirty = True
+
+    def is_current(self, selection_key):
+        # Whether the cached stats are up to date and complete for this selection
+        return not self.dirty and self.job is None and self.rank_result is not None and self.selection_key == selection_key
+
+    def cancel_job(self):
+        # The timer stops by itself once it sees its job is no longer the current one
+        self.job = None
+
+    def get(self):
+        if perf_stats.enabled:
+            start = perf_counter()
+
+        obj, is_collection = VRCGlobalFunctions.get_selected()
+        selection_key = VRCGlobalFunctions.get_selection_key(obj, is_collection)
+
+        if perf_stats.enabled:
+            perf_stats.add_time("Selection", start)
+
+        if self.dirty or selection_key != self.selection_key:
+            if perf_stats.enabled:
+                perf_stats.count("Stats cache misses")
+            self.refresh(obj, is_collection, selection_key)
+        elif perf_stats.enabled:
+            perf_stats.count("Stats cache hits")
+
+        return self
+
+    def refresh(self, obj, is_collection, selection_key):
+        self.cancel_job()
+        self.selection_key = selection_key
+        self.dirty = False
+        self.objects = []
+        self.version += 1
+
+        self.icon, self.object_name = VRCGlobalFunctions.get_icon_and_name(obj, is_collection)
+        if obj is None:
+            self.measured_stats = None
+            self.rank_result = None
             return
 
+        if perf_stats.enabled:
+            start = perf_counter()
+
+        settings = get_settings()
+        evaluated = settings is not None and settings.count_evaluated
+        analyze_bones = settings is not None and settings.analyze_bones
+        roots = VRCGlobalFunctions.get_walk_roots(obj, is_collection)
+        objects = list(VRCGlobalFunctions.iter_objects(roots, is_collection))
+        self.objects = objects
+
+        if perf_stats.enabled:
+            perf_stats.add_time("Traversal", start)
+            perf_stats.count("Objects visited", len(objects))
+
+        if len(objects) <= PROGRESSIVE_MIN_OBJECTS or bpy.app.background:
+            if perf_stats.enabled:
+                start = perf_counter()
+
+            depsgraph = bpy.context.evaluated_depsgraph_get() if evaluated else None
+            measured_stats = MeasuredStats(analyze_bones)
+            for element in objects:
+                VRCGlobalFunctions.get_stats_for_object(element, measured_stats, depsgraph)
+            self.measured_stats = measured_stats
+
+            if perf_stats.enabled:
+                perf_stats.add_time("Counting", start)
+                perf_stats.count("Mesh lookups", measured_stats.skinned_mesh + measured_stats.basic_mesh)
+            self.update_ranks()
+            return
+
+        # Too many objects to count inside Panel.draw, spread them over timer ticks
+        # and show the partial totals meanwhile
+        self.job = StatsJob(objects, evaluated, analyze_bones)
+        self.measured_stats = self.job.measured_stats
+        self.update_ranks()
+        if not bpy.app.timers.is_registered(run_stats_job):
+            bpy.app.timers.register(run_stats_job)
+
+    def update_ranks(self):
+        # Rank the current stats once, drawing only reads the result
+        if perf_stats.enabled:
+            start = perf_counter()
+        self.rank_result = RankResult(self.measured_stats)
+        if perf_stats.enabled:
+            perf_stats.add_time("Ranking", start)
+
+    def finish_job(self, job):
+        if job is self.job:
+            self.job = None
+
+
+class StatsJob:
+    # A stats pass split into time-budgeted chunks
+
+    def __init__(self, objects, evaluated, analyze_bones=False):
+        self.objects = objects
+        self.evaluated = evaluated
+        self.position = 0
+        self.measured_stats = MeasuredStats(analyze_bones)
+
+    def get_progress(self):
+        return self.position / len(self.objects) if self.objects else 1.0
+
+    def step(self, budget):
+        # Count objects until the budget (seconds) is used up. Returns True when done.
+        depsgraph = bpy.context.evaluated_depsgraph_get() if self.evaluated else None
+        start = perf_counter()
+        deadline = start + budget
+        objects = self.objects
+        while self.position < len(objects):
+            VRCGlobalFunctions.get_stats_for_object(objects[self.position], self.measured_stats, depsgraph)
+            self.position += 1
+            if perf_counter() >= deadline:
+                break
+
+        done = self.position >= len(objects)
+        if perf_stats.enabled:
+            perf_stats.add_time("Counting", start)
+            if done:
+                perf_stats.count("Mesh lookups", self.measured_stats.skinned_mesh + self.measured_stats.basic_mesh)
+        return done
+
+
+# Selections with more objects than this are counted progressively
+PROGRESSIVE_MIN_OBJECTS = 200
+# Time spent counting per timer tick, in seconds
+PROGRESSIVE_BUDGET = 0.004
+
+
+def run_stats_job():
+    job = stats_cache.job
+    if job is None:
+        return None
+
+    try:
+        done = job.step(PROGRESSIVE_BUDGET)
+    except ReferenceError:
+        # An object was removed mid-pass, start over on the next redraw
+        stats_cache.cancel_job()
+        stats_cache.invalidate()
+        done = True
+
+    if job is stats_cache.job:
+        stats_cache.update_ranks()
+    tag_redraw_sidebar()
+    if done:
+        stats_cache.finish_job(job)
+        return None
+    return 0.0
+
+
+def tag_redraw_sidebar():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+
+
+stats_cache = StatsCache()
+
+
+def get_id_key(id_data):
+    # session_uid survives renames and undo, fall back to the name on older Blender versions
+    return getattr(id_data, "session_uid", None) or id_data.name_full
+
+
+class MeshStatEntry:
+    # Stats of a single mesh datablock, shared by every object using it
+
+    __slots__ = ("tri_count", "mat_count")
+
+    def __init__(self, tri_count, mat_count):
+        self.tri_count = tri_count
+        self.mat_count = mat_count
+
+
+class EditMeshEntry:
+    # Tris of a mesh in Edit Mode, valid while its element counts stay the same
+
+    __slots__ = ("signature", "tri_count")
+
+    def __init__(self, signature, tri_count):
+        self.signature = signature
+        self.tri_count = tri_count
+
+
+# Modifiers that only move, smooth or reweight vertices. A stack made of these alone
+# keeps the mesh's own tri count, so it's read from the mesh instead of evaluated.
+DEFORM_MODIFIER_TYPES = frozenset((
+    "ARMATURE", "CAST", "CORRECTIVE_SMOOTH", "CURVE", "DATA_TRANSFER", "DISPLACE", "HOOK",
+    "LAPLACIANDEFORM", "LAPLACIANSMOOTH", "LATTICE", "MESH_DEFORM", "NORMAL_EDIT", "SHRINKWRAP",
+    "SIMPLE_DEFORM", "SMOOTH", "SURFACE_DEFORM", "UV_PROJECT", "UV_WARP", "VERTEX_WEIGHT_EDIT",
+    "VERTEX_WEIGHT_MIX", "VERTEX_WEIGHT_PROXIMITY", "WARP", "WAVE", "WEIGHTED_NORMAL",
+))
+
+
+class MeshStatIndex:
+    # Persistent per-mesh stats. Entries are only dropped when the depsgraph reports
+    # a geometry change for them, so totals are re-summed from cached entries and an
+    # edit only costs the meshes that were actually touched.
+
+    def __init__(self):
+        self.meshes = {}
+        self.skinned = {}
+        # Post-modifier tri counts per object, modifiers are per object so these can't be shared
+        self.evaluated_tris = {}
+        # Tris of meshes in Edit Mode, whose polygons are stale until the mode is left
+        self.edit_tris = {}
+
+    def clear(self):
+        self.meshes.clear()
+        self.skinned.clear()
+        self.evaluated_tris.clear()
+        self.edit_tris.clear()
+
+    def get(self, obj, depsgraph=None):
+        # Returns tris, material slots and whether the object is a skinned mesh.
+        # With a depsgraph the tris are counted after modifiers.
+        mesh_key = get_id_key(obj.data)
+        mesh_entry = self.meshes.get(mesh_key)
+        if mesh_entry is None:
+            if perf_stats.enabled:
+                perf_stats.count("Mesh cache misses")
+            tri_count, mat_count = VRCGlobalFunctions.get_materials_and_tris_from_mesh(obj)
+            mesh_entry = MeshStatEntry(tri_count, mat_count)
+            self.meshes[mesh_key] = mesh_entry
+
+        object_key = get_id_key(obj)
+        is_skinned = self.skinned.get(object_key)
+        if is_skinned is None:
+            is_skinned = VRCGlobalFunctions.is_skinned_mesh(obj)
+            self.skinned[object_key] = is_skinned
+
+        if depsgraph is None or VRCGlobalFunctions.has_deform_modifiers_only(obj):
+            if obj.data.is_editmode:
+                return self.get_edit_tri_count(obj.data), mesh_entry.mat_count, is_skinned
+            return mesh_entry.tri_count, mesh_entry.mat_count, is_skinned
+
+        tri_count = self.evaluated_tris.get(object_key)
+        if tri_count is None:
+            if perf_stats.enabled:
+                perf_stats.count("Evaluated cache misses")
+            tri_count = VRCGlobalFunctions.get_evaluated_tri_count(obj, depsgraph)
+            self.evaluated_tris[object_key] = tri_count
+
+        return tri_count, mesh_entry.mat_count, is_skinned
+
+    def get_edit_tri_count(self, mesh):
+        # Read from the edit BMesh instead of syncing it back to the mesh. Every edit
+        # sends a depsgraph update, but only the ones changing the element counts
+        # (dissolve, delete, subdivide...) sum the faces again.
+        bm = bmesh.from_edit_mesh(mesh)
+        signature = (len(bm.verts), len(bm.edges), len(bm.faces))
+        mesh_key = get_id_key(mesh)
+        entry = self.edit_tris.get(mesh_key)
+        if entry is None or entry.signature != signature:
+            if perf_stats.enabled:
+                perf_stats.count("Edit mesh recounts")
+            entry = EditMeshEntry(signature, VRCGlobalFunctions.get_bmesh_tri_count(bm))
+            self.edit_tris[mesh_key] = entry
+        return entry.tri_count
+
+    def invalidate_object(self, obj):
+        # Modifier stack or geometry of the object changed
+        object_key = get_id_key(obj)
+        self.skinned.pop(object_key, None)
+        self.evaluated_tris.pop(object_key, None)
+        if obj.type == "MESH" and obj.data is not None:
+            self.meshes.pop(get_id_key(obj.data), None)
+
+    def invalidate_mesh(self, mesh):
+        self.meshes.pop(get_id_key(mesh), None)
+
+
+mesh_stat_index = MeshStatIndex()
+
+
+class ImageMemoryEntry:
+    # Estimated size of one image, valid as long as the signature matches
+
+    __slots__ = ("signature", "pc_bytes", "mobile_bytes", "has_alpha")
+
+    def __init__(self, signature, pc_bytes, mobile_bytes, has_alpha):
+        self.signature = signature
+        self.pc_bytes = pc_bytes
+        self.mobile_bytes = mobile_bytes
+        self.has_alpha = has_alpha
+
+
+class TextureMemoryIndex:
+    # Texture memory estimates per image and the images used by each material.
+    # Reading an image's size loads it, so sizes are kept until the image's file
+    # changes on disk, and node trees are only walked again after the material
+    # or a node tree is edited.
+
+    def __init__(self):
+        self.images = {}
+        self.material_images = {}
+        self.mobile_format = "ASTC_6x6"
+
+    def clear(self):
+        self.images.clear()
+        self.material_images.clear()
+
+    def set_mobile_format(self, texture_format):
+        if texture_format != self.mobile_format:
+            self.mobile_format = texture_format
+            self.images.clear()
+
+    def add_object(self, obj, measured_stats):
+        image_keys = measured_stats.image_keys
+        for slot in obj.material_slots:
+            if slot.material is None:
+                continue
+            for image in self.get_material_images(slot.material):
+                image_key = get_id_key(image)
+                if image_key in image_keys:
+                    continue
+                image_keys.add(image_key)
+                entry = self.get_image_entry(image, image_key)
+                measured_stats.texture_bytes_pc += entry.pc_bytes
+                measured_stats.texture_bytes_mobile += entry.mobile_bytes
+
+    def get_material_images(self, material):
+        material_key = get_id_key(material)
+        images = self.material_images.get(material_key)
+        if images is None:
+            found = {}
+            if material.use_nodes and material.node_tree is not None:
+                VRCGlobalFunctions.get_node_tree_images(material.node_tree, found, set())
+            images = tuple(found.values())
+            self.material_images[material_key] = images
+        return images
+
+    def get_image_entry(self, image, image_key):
+        signature = TextureMemoryIndex.get_image_signature(image)
+        entry = self.images.get(image_key)
+        if entry is not None and entry.signature == signature:
+            return entry
+
+        if perf_stats.enabled:
+            perf_stats.count("Image cache misses")
+        width, height = image.size
+        # Unity picks a format with alpha only if the texture has an alpha channel
+        has_alpha = image.channels == 4 and image.alpha_mode != "NONE"
+        pc_format = "BC7" if has_alpha else "DXT1"
+        entry = ImageMemoryEntry(
+            signature,
+            VRCGlobalFunctions.get_texture_bytes(width, height, pc_format),
+            VRCGlobalFunctions.get_texture_bytes(width, height, self.mobile_format),
+            has_alpha,
+        )
+        self.images[image_key] = entry
+        return entry
+
+    @staticmethod
+    def get_image_signature(image):
+        # Whatever the size of the image depends on, without loading it
+        if image.source == "GENERATED":
+            return image.source, image.generated_width, image.generated_height
+        if image.packed_file is not None:
+            return "PACKED", image.packed_file.size
+        path = bpy.path.abspath(image.filepath, library=image.library)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        return image.source, path, mtime
+
+    def invalidate_material(self, material):
+        self.material_images.pop(get_id_key(material), None)
+
+    def invalidate_image(self, image):
+        self.images.pop(get_id_key(image), None)
+
+
+texture_memory_index = TextureMemoryIndex()
+
+
+GET_GROUPS = attrgetter("groups")
+GET_GROUP_AND_WEIGHT = attrgetter("group", "weight")
+
+
+class BoneUsageIndex:
+    # Total vertex weight per vertex group of every mesh, to find the bones of an
+    # armature that nothing is weighted to. Reading the weights is the slow part,
+    # so the totals are kept per mesh until the mesh itself is updated.
+
+    def __init__(self):
+        self.group_weights = {}
+        # Armature key -> (armature, {object key: mesh object deformed by it})
+        self.bound_objects = {}
+        self.object_count = 0
+
+    def clear(self):
+        self.group_weights.clear()
+        self.bound_objects.clear()
+
+    def invalidate_mesh(self, mesh):
+        self.group_weights.pop(get_id_key(mesh), None)
+
+    def invalidate_object(self, obj):
+        # Parent or modifiers may have changed, recheck the object against each cached armature
+        if obj.type != "MESH":
+            return
+        object_key = get_id_key(obj)
+        for armature, bound in self.bound_objects.values():
+            if BoneUsageIndex.is_bound_to(obj, armature):
+                bound[object_key] = obj
+            else:
+                bound.pop(object_key, None)
+
+    def get_bound_objects(self, armature):
+        # Mesh objects deformed by the armature, found with one scan of all objects and
+        # then kept up to date per object update
+        if self.object_count != len(bpy.data.objects):
+            self.bound_objects.clear()
+            self.object_count = len(bpy.data.objects)
+
+        armature_key = get_id_key(armature)
+        entry = self.bound_objects.get(armature_key)
+        if entry is None:
+            bound = {get_id_key(obj): obj for obj in bpy.data.objects if BoneUsageIndex.is_bound_to(obj, armature)}
+            entry = (armature, bound)
+            self.bound_objects[armature_key] = entry
+        return entry[1].values()
+
+    def get_group_weights(self, mesh):
+        # Sequence indexed by vertex group index, with the summed weight of that group
+        mesh_key = get_id_key(mesh)
+        weights = self.group_weights.get(mesh_key)
+        if weights is None:
+            if perf_stats.enabled:
+                perf_stats.count("Weight cache misses")
+            weights = BoneUsageIndex.sum_group_weights(mesh)
+            self.group_weights[mesh_key] = weights
+        return weights
+
+    @staticmethod
+    def sum_group_weights(mesh):
+        # There is no foreach_get for deform weights, so this is an O(vertices) read
+        # through RNA, one proxy per vertex and group element. It only runs on a cache
+        # miss, the pairs are streamed into one flat array and summed with a single bincount.
+        elements = chain.from_iterable(map(GET_GROUPS, mesh.vertices))
+        pairs = chain.from_iterable(map(GET_GROUP_AND_WEIGHT, elements))
+        if numpy is not None:
+            pairs = numpy.fromiter(pairs, dtype=numpy.float64).reshape(-1, 2)
+            if len(pairs) == 0:
+                return ()
+            return numpy.bincount(pairs[:, 0].astype(numpy.intp), weights=pairs[:, 1])
+
+        # Without NumPy the pairs are still a flat stream, consume it two at a time
+        weights = {}
+        for group, weight in zip(pairs, pairs):
+            weights[group] = weights.get(group, 0.0) + weight
+        return [weights.get(index, 0.0) for index in range(max(weights, default=-1) + 1)]
+
+    @staticmethod
+    def is_bound_to(obj, armature):
+        if obj.type != "MESH":
+            return False
+        if obj.parent is armature and obj.parent_type == "ARMATURE":
+            return True
+        return any(mod.type == "ARMATURE" and mod.object is armature for mod in obj.modifiers)
+
+    def get_weighted_groups(self, armature):
+        # Names of the vertex groups with any weight on a mesh deformed by the armature
+        weighted = set()
+        for obj in self.get_bound_objects(armature):
+            weights = self.get_group_weights(obj.data)
+            for group in obj.vertex_groups:
+                if group.index < len(weights) and weights[group.index] > 0:
+                    weighted.add(group.name)
+        return weighted
+
+    def get_unused_bones(self, armature):
+        # Bones with no weight, no weighted descendants and no constraints, parents first
+        bones = armature.data.bones
+        weighted = self.get_weighted_groups(armature)
+        constrained = set()
+        if armature.pose is not None:
+            constrained = {pose_bone.name for pose_bone in armature.pose.bones if len(pose_bone.constraints) > 0}
+
+        order = []
+        stack = [bone for bone in bones if bone.parent is None]
+        while stack:
+            bone = stack.pop()
+            order.append(bone)
+            stack.extend(bone.children)
+
+        used = set()
+        for bone in reversed(order):
+            if bone.name in used or bone.name in weighted or bone.name in constrained:
+                used.add(bone.name)
+                if bone.parent is not None:
+                    used.add(bone.parent.name)
+
+        return [bone.name for bone in order if bone.name not in used]
+
+
+bone_usage_index = BoneUsageIndex()
+
+
+class HierarchyIndex:
+    # Parent -> children lookup for every object in the file. Built once and reused
+    # until the hierarchy changes, instead of scanning all objects per
+    # children_recursive call.
+
+    def __init__(self):
+        self.children = None
+        # Object -> parent key as of the last build, to tell reparenting from plain moves
+        self.parents = {}
+        self.object_count = 0
+        # Bumped on every rebuild so other caches can tell the hierarchy may have changed
+        self.version = 0
+
+    def clear(self):
+        self.children = None
+        self.parents.clear()
+
+    def invalidate_object(self, obj):
+        # Transform updates also come from moving or animating, only rebuild when the parent
+        # changed. Returns whether it did.
+        if self.children is None:
+            return False
+        parent_key = get_id_key(obj.parent) if obj.parent is not None else None
+        if self.parents.get(get_id_key(obj)) != parent_key:
+            self.clear()
+            return True
+        return False
+
+    def get_children(self):
+        if self.children is None or self.object_count != len(bpy.data.objects):
+            self.build()
+        return self.children
+
+    def build(self):
+        children = {}
+        parents = {}
+        for obj in bpy.data.objects:
+            if obj.parent is not None:
+                parent_key = get_id_key(obj.parent)
+                children.setdefault(parent_key, []).append(obj)
+                parents[get_id_key(obj)] = parent_key
+        self.children = children
+        self.parents = parents
+        self.object_count = len(bpy.data.objects)
+        self.version += 1
+
+    def walk(self, roots):
+        # Depth first over the roots and all their descendants, yielding every object once
+        children = self.get_children()
+        visited = set()
+        stack = list(reversed(roots))
+        while stack:
+            obj = stack.pop()
+            key = get_id_key(obj)
+            if key in visited:
+                continue
+            visited.add(key)
+            yield obj
+            stack.extend(reversed(children.get(key, ())))
+
+
+hierarchy_index = HierarchyIndex()
+
+
+class CollectionIndex:
+    # Every object of a collection tree (child collections, hidden, disabled and
+    # excluded objects included), per collection. Resolved once per collection and
+    # kept until collection links change, so selecting a collection stays cheap on
+    # deep hierarchies.
+
+    def __init__(self):
+        self.members = {}
+        self.object_count = 0
+
+    def clear(self):
+        self.members.clear()
+
+    def get_objects(self, collection):
+        # Deleting objects doesn't always report the collections they were in
+        if self.object_count != len(bpy.data.objects):
+            self.members.clear()
+            self.object_count = len(bpy.data.objects)
+
+        collection_key = get_id_key(collection)
+        objects = self.members.get(collection_key)
+        if objects is None:
+            if perf_stats.enabled:
+                perf_stats.count("Collection cache misses")
+            # all_objects is resolved in C and lists objects shared by several children once
+            objects = tuple(collection.all_objects)
+            self.members[collection_key] = objects
+        return objects
+
+
+collection_index = CollectionIndex()
+
+
+class AvatarEntry:
+    # Stats of one avatar (an armature root and everything under it)
+
+    __slots__ = ("root", "members", "member_keys", "measured_stats", "rank_result")
+
+    def __init__(self, root, members, member_keys):
+        self.root = root
+        self.members = members
+        self.member_keys = member_keys
+        self.measured_stats = None
+        self.rank_result = None
+
+
+class AvatarOverview:
+    # Stats of every avatar in the scene for the overview list. The avatars are found
+    # in one pass over the scene objects and share the per-mesh index, and only
+    # avatars owning a changed object or datablock are recounted.
+
+    def __init__(self):
+        self.entries = {}
+        self.order = []
+        # Object/data key -> keys of the avatars using it
+        self.owners = {}
+        self.dirty = set()
+        self.hierarchy_version = None
+        self.scene_key = None
+
+    def clear(self):
+        self.entries.clear()
+        self.order.clear()
+        self.owners.clear()
+        self.dirty.clear()
+        self.hierarchy_version = None
+
+    def invalidate_id(self, id_data):
+        avatars = self.owners.get(get_id_key(id_data))
+        if avatars:
+            self.dirty.update(avatars)
+
+    def invalidate_all(self):
+        self.dirty.update(self.entries)
+
+    def get(self, scene, depsgraph=None):
+        hierarchy_index.get_children()
+        if self.hierarchy_version != hierarchy_index.version or self.scene_key != get_id_key(scene):
+            self.rebuild(scene)
+
+        for key in self.dirty:
+            entry = self.entries[key]
+            measured_stats = MeasuredStats()
+            for member in VRCGlobalFunctions.filter_counted(entry.members):
+                VRCGlobalFunctions.get_stats_for_object(member, measured_stats, depsgraph)
+            entry.measured_stats = measured_stats
+            entry.rank_result = RankResult(measured_stats)
+        self.dirty.clear()
+
+        return [self.entries[key] for key in self.order]
+
+    def rebuild(self, scene):
+        entries = {}
+        owners = {}
+        for root in VRCGlobalFunctions.find_avatar_roots(scene.objects):
+            key = get_id_key(root)
+            members = list(hierarchy_index.walk([root]))
+            member_keys = tuple(get_id_key(member) for member in members)
+
+            # Keep the stats of avatars whose objects are the same as before
+            entry = self.entries.get(key)
+            if entry is None or entry.member_keys != member_keys:
+                entry = AvatarEntry(root, members, member_keys)
+                self.dirty.add(key)
+            else:
+                entry.root = root
+                entry.members = members
+            entries[key] = entry
+
+            for member in members:
+                owners.setdefault(get_id_key(member), set()).add(key)
+                if member.data is not None:
+                    owners.setdefault(get_id_key(member.data), set()).add(key)
+
+        self.entries = entries
+        self.order = list(entries)
+        self.owners = owners
+        self.dirty &= entries.keys()
+        self.hierarchy_version = hierarchy_index.version
+        self.scene_key = get_id_key(scene)
+
+    def get_entry(self, obj):
+        return self.entries.get(get_id_key(obj)) if obj is not None else None
+
+
+avatar_overview = AvatarOverview()
+
+HISTORY_EXTENSION = ".vrcperf"
+HISTORY_MAGIC = b"VRCPERF1"
+# File header: magic and category count, followed by the category names
+HISTORY_HEADER = struct.Struct("<8sH")
+HISTORY_CATEGORY_SIZE = 32
+HISTORY_NAME_SIZE = 64
+# Stored instead of a rank severity for categories a record doesn't have
+HISTORY_NO_RANK = 255
+# Seconds between checks for a deferred snapshot whose stats are counted progressively
+HISTORY_RETRY_INTERVAL = 0.1
+
+# Rank of each severity, see RANK_SEVERITY
+RANKS_BY_SEVERITY = list(Rank)
+
+
+class HistoryRecord:
+    # One save: per category the (PC, Mobile) value and rank, and the (PC, Mobile) overall rank
+
+    __slots__ = ("timestamp", "name", "values", "ranks", "worst")
+
+    def __init__(self, timestamp, name, values, ranks, worst):
+        self.timestamp = timestamp
+        self.name = name
+        self.values = values
+        self.ranks = ranks
+        self.worst = worst
+
+    def get_rank_changes(self, previous):
+        # (category, is_mobile, rank before, rank now) of every rank that changed since previous
+        changes = []
+        for category, ranks in self.ranks.items():
+            previous_ranks = previous.ranks.get(category)
+            if previous_ranks is None:
+                continue
+            for is_mobile in (False, True):
+                before, after = previous_ranks[is_mobile], ranks[is_mobile]
+                if before is not None and after is not None and before != after:
+                    changes.append((category, is_mobile, before, after))
+        return changes
+
+
+class PendingSnapshot:
+    # A save whose stats weren't current yet: where and when, and what was selected
+
+    __slots__ = ("path", "timestamp", "obj", "is_collection", "selection_key")
+
+    def __init__(self, path, timestamp, obj, is_collection, selection_key):
+        self.path = path
+        self.timestamp = timestamp
+        self.obj = obj
+        self.is_collection = is_collection
+        self.selection_key = selection_key
+
+
+class PerfHistory:
+    # Snapshots of the cached stats, one per save, in a sidecar file next to the .blend.
+    # The file is a header naming the categories and then fixed-width records, so a
+    # save only appends a few dozen bytes. Read records are kept until the file changes.
+
+    def __init__(self):
+        self.path = None
+        self.signature = None
+        self.records = []
+        # Snapshot of a save made while the stats were out of date, see on_save_post
+        self.pending = None
+
+    def clear(self):
+        self.path = None
+        self.signature = None
+        self.records = []
+        self.pending = None
+
+    @staticmethod
+    def get_path(blend_path):
+        return blend_path + HISTORY_EXTENSION
+
+    @staticmethod
+    def get_stored_name(name):
+        # The name as a record keeps it: cut to HISTORY_NAME_SIZE bytes on a character
+        # boundary, so long CJK names still compare equal after a round trip
+        return name.encode("utf-8")[:HISTORY_NAME_SIZE].decode("utf-8", "ignore")
+
+    @staticmethod
+    def get_record_struct(category_count):
+        # Timestamp, name, (PC, Mobile) value per category, (PC, Mobile) rank severity
+        # per category, then the PC and Mobile overall rank severity
+        return struct.Struct(f"<d{HISTORY_NAME_SIZE}s{category_count * 2}f{category_count * 2 + 2}B")
+
+    def get_records(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return []
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if path != self.path or signature != self.signature:
+            try:
+                _, self.records = PerfHistory.read(path)
+            except (OSError, ValueError, struct.error) as error:
+                print(f"Could not read the performance history {path}: {error}")
+                self.records = []
+            self.path = path
+            self.signature = signature
+        return self.records
+
+    @staticmethod
+    def read_categories(data):
+        # Category names from the header at the start of data, and the offset of the first record
+        magic, category_count = HISTORY_HEADER.unpack_from(data, 0)
+        if magic != HISTORY_MAGIC:
+            raise ValueError("not a performance history file")
+
+        offset = HISTORY_HEADER.size
+        categories = []
+        for _ in range(category_count):
+            name = data[offset:offset + HISTORY_CATEGORY_SIZE]
+            if len(name) < HISTORY_CATEGORY_SIZE:
+                raise ValueError("truncated performance history header")
+            categories.append(name.rstrip(b"\0").decode("utf-8"))
+            offset += HISTORY_CATEGORY_SIZE
+        return categories, offset
+
+    @staticmethod
+    def read_header(file):
+        # Only the header, so appending doesn't get slower as the history grows
+        data = file.read(HISTORY_HEADER.size)
+        _, category_count = HISTORY_HEADER.unpack_from(data, 0)
+        return PerfHistory.read_categories(data + file.read(category_count * HISTORY_CATEGORY_SIZE))
+
+    @staticmethod
+    def read(path):
+        with open(path, "rb") as file:
+            data = file.read()
+        categories, offset = PerfHistory.read_categories(data)
+        category_count = len(categories)
+
+        record_struct = PerfHistory.get_record_struct(category_count)
+        # A record cut short by an interrupted save is dropped
+        end = offset + (len(data) - offset) // record_struct.size * record_struct.size
+        records = []
+        for fields in record_struct.iter_unpack(data[offset:end]):
+            values = fields[2:2 + category_count * 2]
+            severities = fields[2 + category_count * 2:]
+            records.append(HistoryRecord(
+                fields[0],
+                fields[1].rstrip(b"\0").decode("utf-8", "ignore"),
+                {category: (values[index * 2], values[index * 2 + 1]) for index, category in enumerate(categories)},
+                {
+                    category: (PerfHistory.get_rank(severities[index * 2]), PerfHistory.get_rank(severities[index * 2 + 1]))
+                    for index, category in enumerate(categories)
+                },
+                (PerfHistory.get_rank(severities[-2]), PerfHistory.get_rank(severities[-1])),
+            ))
+        return categories, records
+
+    @staticmethod
+    def get_rank(severity):
+        return RANKS_BY_SEVERITY[severity] if severity < len(RANKS_BY_SEVERITY) else None
+
+    @staticmethod
+    def get_severity(rank):
+        return RANK_SEVERITY[rank] if rank is not None else HISTORY_NO_RANK
+
+    @staticmethod
+    def pack(record_struct, categories, record):
+        values = []
+        severities = []
+        for category in categories:
+            values.extend(record.values.get(category, (float("nan"), float("nan"))))
+            ranks = record.ranks.get(category, (None, None))
+            severities.extend(PerfHistory.get_severity(rank) for rank in ranks)
+        severities.extend(PerfHistory.get_severity(rank) for rank in record.worst)
+        name = PerfHistory.get_stored_name(record.name).encode("utf-8")
+        return record_struct.pack(record.timestamp, name, *values, *severities)
+
+    @staticmethod
+    def write_header(file, categories):
+        file.write(HISTORY_HEADER.pack(HISTORY_MAGIC, len(categories)))
+        for category in categories:
+            file.write(category.encode("utf-8")[:HISTORY_CATEGORY_SIZE].ljust(HISTORY_CATEGORY_SIZE, b"\0"))
+
+    def append(self, path, name, rank_result, timestamp):
+        categories = [value_type.value for value_type in ValueType]
+        record = HistoryRecord(
+            timestamp,
+            name,
+            {value_type.value: (rank_result.get_value(value_type, False), rank_result.get_value(value_type, True)) for value_type in ValueType},
+            {value_type.value: (rank_result.get_step(value_type, False).rank, rank_result.get_step(value_type, True).rank) for value_type in ValueType},
+            (rank_result.get_worst(False).rank, rank_result.get_worst(True).rank),
+        )
+        record_struct = PerfHistory.get_record_struct(len(categories))
+
+        file_categories = None
+        if os.path.exists(path):
+            with open(path, "r+b") as file:
+                try:
+                    file_categories, offset = PerfHistory.read_header(file)
+                except (ValueError, struct.error):
+                    # Not readable as a history, start over rather than append to it
+                    file_categories = None
+                if file_categories == categories:
+                    # Cut a record left short by an interrupted save, so the new one stays aligned
+                    end = file.seek(0, os.SEEK_END)
+                    end = offset + (end - offset) // record_struct.size * record_struct.size
+                    file.truncate(end)
+                    file.seek(end)
+                    file.write(PerfHistory.pack(record_struct, categories, record))
+
+        if file_categories != categories:
+            # New file, or written by a version with other categories: rewrite it with the current ones
+            records = []
+            if file_categories is not None:
+                _, records = PerfHistory.read(path)
+            with open(path, "wb") as file:
+                PerfHistory.write_header(file, categories)
+                for old_record in records:
+                    file.write(PerfHistory.pack(record_struct, categories, old_record))
+                file.write(PerfHistory.pack(record_struct, categories, record))
+        self.signature = None
+
+
+perf_history = PerfHistory()
+
+
+class PlanRenderer:
+    # A mesh object of the selection as the planner sees it
+
+    __slots__ = ("key", "mat_count", "materials")
+
+    def __init__(self, key, mat_count, materials):
+        self.key = key
+        self.mat_count = mat_count
+        self.materials = materials
+
+
+class PlanCandidate:
+    # A suggested merge: skinned meshes deformed by the same armature ("MERGE"), or
+    # materials whose textures could share one atlas ("ATLAS")
+
+    __slots__ = ("key", "kind", "label", "members")
+
+    def __init__(self, key, kind, label, members):
+        self.key = key
+        self.kind = kind
+        self.label = label
+        self.members = members
+
+
+class WhatIfPlanner:
+    # Projects the stats of the selection after merging meshes and atlasing materials.
+    # Candidates are found once per recount of the selection from the cached mesh and
+    # texture stats; toggling one only re-runs the projection, nothing is joined.
+
+    def __init__(self):
+        self.candidates = []
+        self.renderers = []
+        # Keys of the candidates the user switched on
+        self.enabled = set()
+        self.stats_version = None
+        # Ranks per combination of enabled candidates, frozenset of keys -> RankResult
+        self.projections = {}
+
+    def clear(self):
+        self.candidates = []
+        self.renderers = []
+        self.enabled.clear()
+        self.stats_version = None
+        self.projections.clear()
+
+    def get(self):
+        # None while there is nothing to plan for, or the selection is still being counted
+        cached = stats_cache.get()
+        if cached.measured_stats is None or cached.job is not None:
+            return None
+        if self.stats_version != cached.version:
+            self.rebuild(cached.objects)
+            self.stats_version = cached.version
+        return self
+
+    def toggle(self, key):
+        if key in self.enabled:
+            self.enabled.remove(key)
+        else:
+            self.enabled.add(key)
+
+    def rebuild(self, objects):
+        renderers = []
+        meshes_by_armature = {}
+        materials = {}
+        for obj in objects:
+            if isinstance(obj, bpy.types.Collection) or obj.type != "MESH":
+                continue
+            _, mat_count, is_skinned = mesh_stat_index.get(obj)
+            slot_materials = []
+            for slot in obj.material_slots:
+                slot_materials.append(get_id_key(slot.material) if slot.material is not None else None)
+                if slot.material is not None:
+                    materials[get_id_key(slot.material)] = slot.material
+            renderers.append(PlanRenderer(get_id_key(obj), mat_count, tuple(slot_materials)))
+
+            armature = next((mod.object for mod in obj.modifiers if mod.type == "ARMATURE" and mod.object is not None), None)
+            if is_skinned and armature is not None:
+                meshes_by_armature.setdefault(armature.name, []).append(get_id_key(obj))
+
+        candidates = []
+        for armature_name, members in meshes_by_armature.items():
+            if len(members) > 1:
+                candidates.append(PlanCandidate(f"merge:{armature_name}", "MERGE", f"Merge {len(members)} meshes on {armature_name}", members))
+
+        # Materials can share an atlas if they use the same number of textures with the same alpha usage
+        materials_by_images = {}
+        for material_key, material in materials.items():
+            images = texture_memory_index.get_material_images(material)
+            if not images:
+                continue
+            signature = tuple(sorted(
+                texture_memory_index.get_image_entry(image, get_id_key(image)).has_alpha for image in images
+            ))
+            materials_by_images.setdefault(signature, []).append(material_key)
+        for signature, members in materials_by_images.items():
+            if len(members) > 1:
+                alpha_count = sum(signature)
+                label = f"Atlas {len(members)} materials ({len(signature)} textures"
+                label += f", {alpha_count} with alpha)" if alpha_count else ")"
+                candidates.append(PlanCandidate(f"atlas:{len(signature)}:{alpha_count}", "ATLAS", label, members))
+
+        self.renderers = renderers
+        self.candidates = candidates
+        self.enabled &= {candidate.key for candidate in candidates}
+        self.projections.clear()
+
+    def get_projection(self, enabled):
+        # Ranked projection for the given candidate keys, only computed the first time
+        enabled = frozenset(enabled)
+        projection = self.projections.get(enabled)
+        if projection is None:
+            projection = RankResult(self.project(stats_cache.measured_stats, enabled))
+            self.projections[enabled] = projection
+        return projection
+
+    def project(self, measured_stats, enabled=None):
+        # Stats after applying the enabled candidates. Merged meshes and atlased materials
+        # keep one slot per distinct (atlased) material, everything else keeps its slots.
+        enabled = self.enabled if enabled is None else enabled
+        atlas_of = {}
+        merge_of = {}
+        skinned_mesh = measured_stats.skinned_mesh
+        for candidate in self.candidates:
+            if candidate.key not in enabled:
+                continue
+            if candidate.kind == "MERGE":
+                skinned_mesh -= len(candidate.members) - 1
+                for member in candidate.members:
+                    merge_of[member] = candidate.key
+            else:
+                for member in candidate.members:
+                    atlas_of[member] = candidate.key
+
+        mat_count = measured_stats.total_mat_count
+        merged_slots = {}
+        for renderer in self.renderers:
+            merge_key = merge_of.get(renderer.key)
+            if merge_key is None and not any(material in atlas_of for material in renderer.materials):
+                continue
+            mat_count -= renderer.mat_count
+            slots = {atlas_of.get(material, material) for material in renderer.materials}
+            if merge_key is None:
+                mat_count += len(slots)
+            else:
+                merged_slots.setdefault(merge_key, set()).update(slots)
+        mat_count += sum(len(slots) for slots in merged_slots.values())
+
+        projected = measured_stats.copy()
+        projected.skinned_mesh = skinned_mesh
+        projected.total_mat_count = mat_count
+        return projected
+
+
+what_if_planner = WhatIfPlanner()
+
+# ID types whose updates can change the measured stats. Scene-only updates
+# (e.g. selection syncs) are covered by the selection key check in StatsCache.get
+STATS_RELEVANT_TYPES = (
+    bpy.types.Object,
+    bpy.types.Mesh,
+    bpy.types.Armature,
+    bpy.types.Collection,
+    bpy.types.Material,
+    bpy.types.NodeTree,
+    bpy.types.Image,
+)
+
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+    for update in depsgraph.updates:
+        id_data = update.id.original
+        is_relevant = isinstance(id_data, STATS_RELEVANT_TYPES)
+        if isinstance(id_data, bpy.types.Object):
+            if update.is_updated_geometry:
+                mesh_stat_index.invalidate_object(id_data)
+                avatar_overview.invalidate_id(id_data)
+            # Parenting changes always come with a transform update. Moves, animation playback
+            # and drivers send those on every frame, so a transform alone only matters when
+            # the object was reparented.
+            if update.is_updated_transform:
+                is_relevant = hierarchy_index.invalidate_object(id_data)
+            bone_usage_index.invalidate_object(id_data)
+        elif isinstance(id_data, bpy.types.Mesh):
+            mesh_stat_index.invalidate_mesh(id_data)
+            # Deform weights live on the mesh, posing only updates the objects using it
+            bone_usage_index.invalidate_mesh(id_data)
+            avatar_overview.invalidate_id(id_data)
+        elif isinstance(id_data, bpy.types.Armature):
+            avatar_overview.invalidate_id(id_data)
+        elif isinstance(id_data, bpy.types.Collection):
+            # Objects or child collections linked or unlinked
+            hierarchy_index.clear()
+            collection_index.clear()
+        elif isinstance(id_data, bpy.types.Scene):
+            # Hiding or excluding objects only updates the scene, which otherwise doesn't matter
+            settings = getattr(id_data, "vrc_perf_settings", None)
+            if settings is not None and not settings.count_hidden:
+                stats_cache.invalidate()
+                avatar_overview.invalidate_all()
+        elif isinstance(id_data, bpy.types.Material):
+            texture_memory_index.invalidate_material(id_data)
+            avatar_overview.invalidate_all()
+        elif isinstance(id_data, bpy.types.NodeTree):
+            # Node groups can be shared by any material, and embedded trees don't know theirs
+            texture_memory_index.material_images.clear()
+            avatar_overview.invalidate_all()
+        elif isinstance(id_data, bpy.types.Image):
+            # Reloaded, resized or replaced
+            texture_memory_index.invalidate_image(id_data)
+            avatar_overview.invalidate_all()
+
+        if update.is_updated_geometry or is_relevant:
+            stats_cache.invalidate()
+
+
+@persistent
+def on_undo_redo(*args):
+    # Undo restores datablocks without reporting which ones changed
+    mesh_stat_index.clear()
+    texture_memory_index.clear()
+    bone_usage_index.clear()
+    hierarchy_index.clear()
+    collection_index.clear()
+    avatar_overview.clear()
+    stats_cache.invalidate()
+
+
+@persistent
+def on_load_post(*args):
+    mesh_stat_index.clear()
+    texture_memory_index.clear()
+    bone_usage_index.clear()
+    hierarchy_index.clear()
+    collection_index.clear()
+    avatar_overview.clear()
+    what_if_planner.clear()
+    stats_cache.clear()
+    perf_history.clear()
+    # Message bus subscriptions are dropped when a file is loaded
+    subscribe_selection_changes()
+
+
+@persistent
+def on_save_post(*args):
+    # Snapshot of what the panels show, taken from the cache so saving never counts anything.
+    # When the stats are out of date the snapshot is deferred to a timer, which recounts the
+    # selection as it was at the save and records it once that is done.
+    settings = get_settings()
+    if settings is None or not settings.track_history or not bpy.data.filepath:
+        return
+    obj, is_collection = VRCGlobalFunctions.get_selected()
+    if obj is None:
+        return
+    snapshot = PendingSnapshot(
+        PerfHistory.get_path(bpy.data.filepath), time(), obj, is_collection,
+        VRCGlobalFunctions.get_selection_key(obj, is_collection),
+    )
+    if stats_cache.is_current(snapshot.selection_key):
+        record_snapshot(snapshot)
+        return
+    # A later save replaces a snapshot still waiting, it has the newer stats
+    perf_history.pending = snapshot
+    if not bpy.app.timers.is_registered(record_pending_snapshot):
+        bpy.app.timers.register(record_pending_snapshot)
+
+
+def record_snapshot(snapshot):
+    try:
+        perf_history.append(snapshot.path, stats_cache.object_name, stats_cache.rank_result, snapshot.timestamp)
+    except (OSError, ValueError, struct.error) as error:
+        print(f"Could not write the performance history: {error}")
+
+
+def record_pending_snapshot():
+    snapshot = perf_history.pending
+    if snapshot is None:
+        return None
+
+    if stats_cache.job is None and not stats_cache.dirty and stats_cache.selection_key != snapshot.selection_key:
+        print("Performance history: the selection changed before its stats were counted, this save was not recorded")
+        perf_history.pending = None
+        return None
+
+    if stats_cache.job is None and not stats_cache.is_current(snapshot.selection_key):
+        try:
+            stats_cache.refresh(snapshot.obj, snapshot.is_collection, snapshot.selection_key)
+        except ReferenceError:
+            # Objects of the saved selection were removed since
+            print("Performance history: the saved selection changed, this save was not recorded")
+            perf_history.pending = None
+            return None
+        tag_redraw_sidebar()
+
+    if stats_cache.job is not None:
+        if stats_cache.selection_key == snapshot.selection_key:
+            # Counted progressively, check again once more of it is done
+            return HISTORY_RETRY_INTERVAL
+        print("Performance history: the selection changed before its stats were counted, this save was not recorded")
+        perf_history.pending = None
+        return None
+
+    perf_history.pending = None
+    if stats_cache.rank_result is not None:
+        record_snapshot(snapshot)
+    return None
+
+
+def on_selection_changed():
+    # Drop a pass in flight right away, the timer has no screen context to check the selection itself
+    stats_cache.cancel_job()
+    stats_cache.invalidate()
+
+
+def subscribe_selection_changes():
+    bpy.msgbus.clear_by_owner(stats_cache)
+    bpy.msgbus.subscribe_rna(
+        key=(bpy.types.LayerObjects, "active"),
+        owner=stats_cache,
+        args=(),
+        notify=on_selection_changed,
+    )
+    bpy.msgbus.subscribe_rna(
+        key=(bpy.types.ViewLayer, "active_layer_collection"),
+        owner=stats_cache,
+        args=(),
+        notify=on_selection_changed,
+    )
+
+
+def on_settings_changed(self, context):
+    stats_cache.invalidate()
+    avatar_overview.invalidate_all()
+
+
+def on_active_avatar_changed(self, context):
+    # Clicking an avatar in the overview selects it, so the rank panels show its details
+    if not 0 <= self.active_avatar_index < len(self.avatars):
+        return
+    root = self.avatars[self.active_avatar_index].obj
+    if root is None or root.name not in context.view_layer.objects:
+        return
+    for obj in context.selected_objects:
+        obj.select_set(False)
+    root.select_set(True)
+    context.view_layer.objects.active = root
+
+
+class VRCAvatarItem(bpy.types.PropertyGroup):
+    # Row of the avatar overview list, the stats themselves live in AvatarOverview
+
+    obj: bpy.props.PointerProperty(type=bpy.types.Object)
+
+
+class VRCSettings(bpy.types.PropertyGroup):
+    # Per-scene options of the rank panels
+
+    count_evaluated: bpy.props.BoolProperty(
+        name="Count Modifiers",
+        description="Count tris after modifiers (Decimate, Mirror, Subdivision...), as they will be exported",
+        default=False,
+        update=on_settings_changed,
+    )
+
+    count_hidden: bpy.props.BoolProperty(
+        name="Count Hidden Objects",
+        description="Count hidden, disabled and excluded objects too, VRChat counts them as toggleable parts of the avatar",
+        default=True,
+        update=on_settings_changed,
+    )
+
+    track_history: bpy.props.BoolProperty(
+        name="Track History",
+        description="On every save, add the stats shown in the panels to a .vrcperf file next to the .blend file",
+        default=True,
+    )
+
+    analyze_bones: bpy.props.BoolProperty(
+        name="Find Unused Bones",
+        description="List bones that no vertex is weighted to and that have no weighted children or constraints",
+        default=False,
+        update=on_settings_changed,
+    )
+
+    avatars: bpy.props.CollectionProperty(type=VRCAvatarItem)
+    active_avatar_index: bpy.props.IntProperty(update=on_active_avatar_changed)
+
+
+def get_settings():
+    scene = bpy.context.scene
+    return getattr(scene, "vrc_perf_settings", None) if scene is not None else None
+
+
+# Columns of the per-object rows of a report
+REPORT_FIELDS = ["name", "type", "mesh", "tris", "material_slots", "class", "armature", "bones", "tri_share", "material_share"]
+
+# File extension of each report format
+REPORT_EXTENSIONS = {"JSON": ".json", "CSV": ".csv"}
+
+
+class JsonReportWriter:
+    # {"summary": {...}, "objects": [...]}, with the objects written one at a time
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.row_count = 0
+
+    def write_summary(self, summary):
+        self.stream.write('{"summary": ' + json.dumps(summary) + ',\n"objects": [\n')
+
+    def write_row(self, row):
+        if self.row_count:
+            self.stream.write(",\n")
+        self.stream.write(json.dumps(row))
+        self.row_count += 1
+
+    def close(self):
+        self.stream.write("\n]}\n")
+
+
+class CsvReportWriter:
+    # One row per object. The rank summary goes first as "#" comment lines.
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.DictWriter(stream, fieldnames=REPORT_FIELDS)
+        self.row_count = 0
+
+    def write_summary(self, summary):
+        self.stream.write(f"# {summary['selection']} ({summary['profile']})\n")
+        for category, value in summary["stats"].items():
+            ranks = ""
+            if category in summary["pc"]:
+                ranks = f", PC {summary['pc'][category]}, Mobile {summary['mobile'][category]}"
+            self.stream.write(f"# {category}: {value}{ranks}\n")
+        self.stream.write(f"# Overall: PC {summary['overall']['pc']}, Mobile {summary['overall']['mobile']}\n")
+        self.writer.writeheader()
+
+    def write_row(self, row):
+        self.writer.writerow(row)
+        self.row_count += 1
+
+    def close(self):
+        pass
+
+
+def get_report_row(obj, measured_stats, depsgraph=None):
+    # Breakdown of one object of the selection, shares are of the selection's totals
+    row = dict.fromkeys(REPORT_FIELDS)
+    row["name"] = obj.name
+    row["type"] = obj.type
+    if obj.type == "MESH":
+        tri_count, mat_count, is_skinned = mesh_stat_index.get(obj, depsgraph)
+        row["mesh"] = obj.data.name
+        row["tris"] = tri_count
+        row["material_slots"] = mat_count
+        row["class"] = "skinned" if is_skinned else "basic"
+        row["tri_share"] = round(tri_count / measured_stats.total_tri_count, 4) if measured_stats.total_tri_count else 0
+        row["material_share"] = round(mat_count / measured_stats.total_mat_count, 4) if measured_stats.total_mat_count else 0
+        armature = next((mod.object for mod in obj.modifiers if mod.type == "ARMATURE" and mod.object is not None), None)
+        if armature is None and obj.parent is not None and obj.parent.type == "ARMATURE":
+            armature = obj.parent
+        if armature is not None:
+            row["armature"] = armature.name
+    elif obj.type == "ARMATURE":
+        row["bones"] = len(obj.data.bones)
+    return row
+
+
+def export_report(filepath, obj=None, is_collection=False, file_format=None, depsgraph=None):
+    # Write the per-object breakdown of a selection (the current one if obj is None)
+    # to a JSON or CSV file, the format defaults to the file's extension. The objects
+    # are walked twice, once for the totals and once for the rows, and each row is
+    # written as soon as it is made. Returns the number of rows written.
+    if obj is None:
+        obj, is_collection = VRCGlobalFunctions.get_selected()
+        if obj is None:
+            raise ValueError("Nothing is selected")
+    if file_format is None:
+        file_format = "CSV" if filepath.lower().endswith(".csv") else "JSON"
+
+    roots = VRCGlobalFunctions.get_walk_roots(obj, is_collection)
+    measured_stats = MeasuredStats()
+    for element in VRCGlobalFunctions.iter_objects(roots, is_collection):
+        VRCGlobalFunctions.get_stats_for_object(element, measured_stats, depsgraph)
+
+    _, object_name = VRCGlobalFunctions.get_icon_and_name(obj, is_collection)
+    summary = {"selection": object_name, "profile": rank_table.name, "evaluated": depsgraph is not None}
+    summary.update(RankResult(measured_stats).as_dict())
+
+    with open(filepath, "w", encoding="utf-8", newline="") as file:
+        writer = CsvReportWriter(file) if file_format == "CSV" else JsonReportWriter(file)
+        writer.write_summary(summary)
+        for element in VRCGlobalFunctions.iter_objects(roots, is_collection):
+            if not isinstance(element, bpy.types.Collection):
+                writer.write_row(get_report_row(element, measured_stats, depsgraph))
+        writer.close()
+    return writer.row_count
+
 
 class VRCRank(bpy.types.Panel):
     # Panel for PC Rank
@@ -271,239 +2006,716 @@ class VRCRankMobile(bpy.types.Panel):
         VRCGlobalFunctions.determine_draw_path(self.layout, True)
         return
 
-class IconProvider:
-    # Handles icon selection based on ValueType.
 
-    @staticmethod
-    def get_icon(value_type: ValueType, count: int, mobile: bool) -> int:
-        # Returns an icon_value for Blender UI based on the given ValueType.
-        method_name = f"get_{value_type.name.lower()}_icon"
-        method = getattr(IconProvider, method_name, IconProvider.get_default_icon)
-        return method(count, mobile)
+def get_overview_depsgraph(context):
+    settings = context.scene.vrc_perf_settings
+    return context.evaluated_depsgraph_get() if settings.count_evaluated else None
 
-    @staticmethod
-    def get_tris_icon(count: int, mobile: bool) -> int:
-        global custom_icons
-        if mobile:
-            if count <= VRC_ANDROID_TRIS_EXCELLENT:
-                return custom_icons["vrc_excellent"].icon_id
-            elif count <= VRC_ANDROID_TRIS_GOOD:
-                return custom_icons["vrc_good"].icon_id
-            elif count <= VRC_ANDROID_TRIS_MEDIUM:
-                return custom_icons["vrc_medium"].icon_id
-            elif count <= VRC_ANDROID_TRIS_POOR:
-                return custom_icons["vrc_poor"].icon_id
-            else:
-                return custom_icons["vrc_verypoor"].icon_id
-        else:
-            if count <= VRC_PC_TRIS_EXCELLENT:
-                return custom_icons["vrc_excellent"].icon_id
-            elif count <= VRC_PC_TRIS_GOOD:
-                return custom_icons["vrc_good"].icon_id
-            else:
-                return custom_icons["vrc_verypoor"].icon_id
 
-    @staticmethod
-    def get_skinned_mesh_icon(count: int, mobile: bool):
-        global custom_icons
-        if mobile:
-            if count <= VRC_ANDROID_SKINNED_MESH_EXCELLENT:
-                return custom_icons["vrc_excellent"].icon_id
-            elif count <= VRC_ANDROID_SKINNED_MESH_MEDIUM:
-                return custom_icons["vrc_medium"].icon_id
-            else:
-                return custom_icons["vrc_verypoor"].icon_id
-        else:
-            if count <= VRC_PC_SKINNED_MESH_EXCELLENT:
-                return custom_icons["vrc_excellent"].icon_id
-            elif count <= VRC_PC_SKINNED_MESH_GOOD:
-                return custom_icons["vrc_good"].icon_id
-            elif count <= VRC_PC_SKINNED_MESH_MEDIUM:
-                return custom_icons["vrc_medium"].icon_id
-            elif count <= VRC_PC_SKINNED_MESH_POOR:
-                return custom_icons["vrc_poor"].icon_id
-            else:
-                return custom_icons["vrc_verypoor"].icon_id
+def sync_avatar_items():
+    # Make the overview list rows match the avatars in the scene. Runs from a timer,
+    # ID properties can't be written while drawing.
+    scene = bpy.context.scene
+    if scene is None:
+        return None
+    settings = scene.vrc_perf_settings
+    roots = [avatar_overview.entries[key].root for key in avatar_overview.order]
+    if [item.obj for item in settings.avatars] != roots:
+        settings.avatars.clear()
+        for root in roots:
+            item = settings.avatars.add()
+            item.name = root.name
+            item.obj = root
+        tag_redraw_sidebar()
+    return None
 
-    @staticmethod
-    def get_basic_mesh_icon(count: int, mobile: bool):
-        global custom_icons
-        if mobile:
-            if count <= VRC_ANDROID_BASIC_MESH_EXCELLENT:
-                return custom_icons["vrc_excellent"].icon_id
-            elif count <= VRC_ANDROID_BASIC_MESH_MEDIUM:
-                return custom_icons["vrc_medium"].icon_id
-            else:
-                return custom_icons["vrc_verypoor"].icon_id
-        else:
-            if count <= VRC_PC_BASIC_MESH_EXCELLENT:
-                return custom_icons["vrc_excellent"].icon_id
-            elif count <= VRC_PC_BASIC_MESH_GOOD:
-                return custom_icons["vrc_good"].icon_id
-            elif count <= VRC_PC_BASIC_MESH_MEDIUM:
-                return custom_icons["vrc_medium"].icon_id
-            elif count <= VRC_PC_BASIC_MESH_POOR:
-                return custom_icons["vrc_poor"].icon_id
-            else:
-                return custom_icons["vrc_verypoor"].icon_id
-
-    @staticmethod
-    def get_materials_icon(count: int, mobile: bool):
-        global custom_icons
-        if mobile:
-            if count <= VRC_ANDROID_MATERIALS_EXCELLENT:
-                return custom_icons["vrc_excellent"].icon_id
-            elif count <= VRC_ANDROID_MATERIALS_MEDIUM:
-                return custom_icons["vrc_medium"].icon_id
-            elif count <= VRC_ANDROID_MATERIALS_POOR:
-                return custom_icons["vrc_poor"].icon_id
-            else:
-                return custom_icons["vrc_verypoor"].icon_id
-        else:
-            if count <= VRC_PC_MATERIALS_EXCELLENT:
-                return custom_icons["vrc_excellent"].icon_id
-            elif count <= VRC_PC_MATERIALS_GOOD:
-                return custom_icons["vrc_good"].icon_id
-            elif count <= VRC_PC_MATERIALS_MEDIUM:
-                return custom_icons["vrc_medium"].icon_id
-            elif count <= VRC_PC_MATERIALS_POOR:
-                return custom_icons["vrc_poor"].icon_id
-            else:
-                return custom_icons["vrc_verypoor"].icon_id
-
-    @staticmethod
-    def get_bones_icon(count: int, mobile: bool):
-        global custom_icons
-        if mobile:
-            if count <= VRC_ANDROID_BONES_EXCELLENT:
-                return custom_icons["vrc_excellent"].icon_id
-            elif count <= VRC_ANDROID_BONES_GOOD:
-                return custom_icons["vrc_good"].icon_id
-            elif count <= VRC_ANDROID_BONES_MEDIUM:
-                return custom_icons["vrc_medium"].icon_id
-            else:
-                return custom_icons["vrc_verypoor"].icon_id
-        else:
-            if count <= VRC_PC_BONES_EXCELLENT:
-                return custom_icons["vrc_excellent"].icon_id
-            elif count <= VRC_PC_BONES_GOOD:
-                return custom_icons["vrc_good"].icon_id
-            elif count <= VRC_PC_BONES_MEDIUM:
-                return custom_icons["vrc_medium"].icon_id
-            elif count <= VRC_PC_BONES_POOR:
-                return custom_icons["vrc_poor"].icon_id
-            else:
-                return custom_icons["vrc_verypoor"].icon_id
 
-    @staticmethod
-    def get_default_icon(count: int, mobile: bool):
-        global custom_icons
-        return custom_icons["vrc_excellent"].icon_id
+class VRCAvatarList(bpy.types.UIList):
+    # One row per avatar: PC ranks, then Mobile ranks, one icon per category
 
-class ValueProvider:
-    # Handles max value selection based on ValueType.
+    bl_idname = "VRC_UL_avatars"
 
-    @staticmethod
-    def get_value(value_type: ValueType, count: int, mobile: bool) -> int:
-        # Returns the next step-up in value based on the given ValueType.
-        method_name = f"get_{value_type.name.lower()}_value"
-        method = getattr(ValueProvider, method_name, ValueProvider.get_default_value)
-        return method(count, mobile)
+    sort_by_rank: bpy.props.BoolProperty(
+        name="Sort by Worst Rank",
+        description="Show the avatars with the worst category first",
+        default=False,
+    )
 
-    @staticmethod
-    def get_tris_value(count: int, mobile: bool) -> int:
-        if mobile:
-            if count <= VRC_ANDROID_TRIS_EXCELLENT:
-                return VRC_ANDROID_TRIS_EXCELLENT
-            elif count <= VRC_ANDROID_TRIS_GOOD:
-                return VRC_ANDROID_TRIS_GOOD
-            elif count <= VRC_ANDROID_TRIS_MEDIUM:
-                return VRC_ANDROID_TRIS_MEDIUM
-            else:
-                return VRC_ANDROID_TRIS_POOR
-        else:
-            if count <= VRC_PC_TRIS_EXCELLENT:
-                return VRC_PC_TRIS_EXCELLENT
-            else:
-                return VRC_PC_TRIS_GOOD
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        entry = avatar_overview.get_entry(item.obj)
+        row = layout.row(align=True)
+        row.label(text=item.name, icon="OUTLINER_OB_ARMATURE")
+        if entry is None or entry.rank_result is None:
+            return
+        for is_mobile in (False, True):
+            icons = row.row(align=True)
+            icons.alignment = "RIGHT"
+            for step in entry.rank_result.steps[is_mobile]:
+                icons.label(text="", icon_value=step.icon_id)
+            if not is_mobile:
+                row.separator()
+
+    def draw_filter(self, context, layout):
+        row = layout.row(align=True)
+        row.prop(self, "filter_name", text="")
+        row.prop(self, "sort_by_rank", text="", icon="SORTSIZE")
 
-    @staticmethod
-    def get_skinned_mesh_value(count: int, mobile: bool) -> int:
-        if mobile:
-            if count <= VRC_ANDROID_SKINNED_MESH_EXCELLENT:
-                return VRC_ANDROID_SKINNED_MESH_EXCELLENT
-            else:
-                return VRC_ANDROID_SKINNED_MESH_MEDIUM
-        else:
-            if count <= VRC_PC_SKINNED_MESH_EXCELLENT:
-                return VRC_PC_SKINNED_MESH_EXCELLENT
-            elif count <= VRC_PC_SKINNED_MESH_GOOD:
-                return VRC_PC_SKINNED_MESH_GOOD
-            elif count <= VRC_PC_SKINNED_MESH_MEDIUM:
-                return VRC_PC_SKINNED_MESH_MEDIUM
-            else:
-                return VRC_PC_SKINNED_MESH_POOR
+    def filter_items(self, context, data, propname):
+        items = getattr(data, propname)
+        helper = bpy.types.UI_UL_list
 
-    @staticmethod
-    def get_basic_mesh_value(count: int, mobile: bool) -> int:
-        if mobile:
-            if count <= VRC_ANDROID_BASIC_MESH_EXCELLENT:
-                return VRC_ANDROID_BASIC_MESH_EXCELLENT
-            else:
-                return VRC_ANDROID_BASIC_MESH_MEDIUM
-        else:
-            if count <= VRC_PC_BASIC_MESH_EXCELLENT:
-                return VRC_PC_BASIC_MESH_EXCELLENT
-            elif count <= VRC_PC_BASIC_MESH_GOOD:
-                return VRC_PC_BASIC_MESH_GOOD
-            elif count <= VRC_PC_BASIC_MESH_MEDIUM:
-                return VRC_PC_BASIC_MESH_MEDIUM
-            else:
-                return VRC_PC_BASIC_MESH_POOR
+        flags = []
+        if self.filter_name:
+            flags = helper.filter_items_by_name(self.filter_name, self.bitflag_filter_item, items, "name")
+
+        order = []
+        if self.sort_by_rank:
+            order = helper.sort_items_helper(
+                [(index, VRCAvatarList.get_worst_ranks(item)) for index, item in enumerate(items)],
+                key=lambda pair: pair[1],
+                reverse=True,
+            )
+        elif self.use_filter_sort_alpha:
+            order = helper.sort_items_by_name(items, "name")
+
+        return flags, order
 
     @staticmethod
-    def get_materials_value(count: int, mobile: bool) -> int:
-        if mobile:
-            if count <= VRC_ANDROID_MATERIALS_EXCELLENT:
-                return VRC_ANDROID_MATERIALS_EXCELLENT
-            elif count <= VRC_ANDROID_MATERIALS_MEDIUM:
-                return VRC_ANDROID_MATERIALS_MEDIUM
-            else:
-                return VRC_ANDROID_MATERIALS_POOR
-        else:
-            if count <= VRC_PC_MATERIALS_EXCELLENT:
-                return VRC_PC_MATERIALS_EXCELLENT
-            elif count <= VRC_PC_MATERIALS_GOOD:
-                return VRC_PC_MATERIALS_GOOD
-            elif count <= VRC_PC_MATERIALS_MEDIUM:
-                return VRC_PC_MATERIALS_MEDIUM
-            else:
-                return VRC_PC_MATERIALS_POOR
+    def get_worst_ranks(item):
+        # Severity of the worst PC category, then of the worst Mobile category
+        entry = avatar_overview.get_entry(item.obj)
+        if entry is None or entry.rank_result is None:
+            return -1, -1
+        return tuple(RANK_SEVERITY[step.rank] for step in entry.rank_result.worst)
+
+
+class VRCOverview(bpy.types.Panel):
+    # Ranks of every avatar in the scene
+
+    bl_label = "VRChat Avatar Overview"
+    bl_idname = "PT_VRCAR_OVERVIEW"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "VRChat"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        settings = context.scene.vrc_perf_settings
+        entries = avatar_overview.get(context.scene, get_overview_depsgraph(context))
+
+        if [item.obj for item in settings.avatars] != [entry.root for entry in entries]:
+            if not bpy.app.timers.is_registered(sync_avatar_items):
+                bpy.app.timers.register(sync_avatar_items)
+
+        if not entries:
+            layout.label(text="No armatures in this scene.")
+            return
+
+        row = layout.row()
+        row.label(text="PC")
+        row.label(text="Mobile")
+        layout.label(text=", ".join(value_type.value for value_type in ValueType))
+        layout.template_list(VRCAvatarList.bl_idname, "", settings, "avatars", settings, "active_avatar_index")
+        layout.operator(VRCRefreshOverview.bl_idname, icon="FILE_REFRESH")
+
+
+class VRCRefreshOverview(bpy.types.Operator):
+    bl_idname = "vrc_perf.refresh_overview"
+    bl_label = "Recount All"
+    bl_description = "Recount every avatar in the scene"
+
+    def execute(self, context):
+        mesh_stat_index.clear()
+        texture_memory_index.clear()
+        bone_usage_index.clear()
+        hierarchy_index.clear()
+        avatar_overview.clear()
+        avatar_overview.get(context.scene, get_overview_depsgraph(context))
+        sync_avatar_items()
+        return {"FINISHED"}
+
+
+class VRCRankSettings(bpy.types.Panel):
+    # Settings shared by both rank panels
+
+    bl_label = "Settings"
+    bl_idname = "PT_VRCAR_SETTINGS"
+    bl_parent_id = "PT_VRCAR"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "VRChat"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        settings = context.scene.vrc_perf_settings
+        self.layout.prop(settings, "count_evaluated")
+        self.layout.prop(settings, "count_hidden")
+        self.layout.prop(settings, "analyze_bones")
+        self.layout.prop(settings, "track_history")
+        self.layout.operator(VRCExportReport.bl_idname, icon="EXPORT")
+
+
+class VRCUnusedBones(bpy.types.Panel):
+    # Bones found by the Find Unused Bones setting
+
+    bl_label = "Unused Bones"
+    bl_idname = "PT_VRCAR_UNUSED_BONES"
+    bl_parent_id = "PT_VRCAR"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "VRChat"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    # Names listed before the rest is summarized
+    MAX_LISTED = 30
+
+    @classmethod
+    def poll(cls, context):
+        settings = getattr(context.scene, "vrc_perf_settings", None)
+        return settings is not None and settings.analyze_bones
+
+    def draw(self, context):
+        layout = self.layout
+        measured_stats = stats_cache.get().measured_stats
+        if measured_stats is None or measured_stats.unused_bones is None:
+            return
+        unused_bones = measured_stats.unused_bones
+        if not unused_bones:
+            layout.label(text="Every bone is used", icon="CHECKMARK")
+            return
+
+        layout.label(text=f"{len(unused_bones)} of {measured_stats.bone_count} bones can be removed")
+        column = layout.column(align=True)
+        for name in unused_bones[:VRCUnusedBones.MAX_LISTED]:
+            column.label(text=name, icon="BONE_DATA")
+        if len(unused_bones) > VRCUnusedBones.MAX_LISTED:
+            column.label(text=f"...and {len(unused_bones) - VRCUnusedBones.MAX_LISTED} more")
+
+
+class VRCWhatIf(bpy.types.Panel):
+    # Projected ranks after the merges suggested by WhatIfPlanner
+
+    bl_label = "What If"
+    bl_idname = "PT_VRCAR_WHAT_IF"
+    bl_parent_id = "PT_VRCAR"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "VRChat"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    # Categories merging meshes or materials can change
+    VALUE_TYPES = (ValueType.SKINNED_MESH, ValueType.MATERIALS)
+
+    def draw(self, context):
+        layout = self.layout
+        planner = what_if_planner.get()
+        if planner is None:
+            layout.label(text="Select an avatar to plan for")
+            return
+        if not planner.candidates:
+            layout.label(text="Nothing to merge", icon="CHECKMARK")
+            return
+
+        column = layout.column(align=True)
+        for candidate in planner.candidates:
+            is_enabled = candidate.key in planner.enabled
+            value_type = ValueType.SKINNED_MESH if candidate.kind == "MERGE" else ValueType.MATERIALS
+            # Rank of the candidate's category with it switched on, on top of the others
+            projected = planner.get_projection(planner.enabled | {candidate.key})
+
+            row = column.row(align=True)
+            toggle = row.operator(
+                VRCToggleCandidate.bl_idname,
+                text=candidate.label,
+                icon="CHECKBOX_HLT" if is_enabled else "CHECKBOX_DEHLT",
+                emboss=False,
+            )
+            toggle.candidate = candidate.key
+            for is_mobile in (False, True):
+                row.label(text="", icon_value=projected.get_step(value_type, is_mobile).icon_id)
+
+        projected = planner.get_projection(planner.enabled)
+        box = layout.box()
+        box.label(text="Projected (PC / Mobile)")
+        for value_type in VRCWhatIf.VALUE_TYPES:
+            before = stats_cache.rank_result.get_value(value_type)
+            after = projected.get_value(value_type)
+            row = box.row(align=True)
+            row.label(text=f"{value_type.value}: {before} -> {after}")
+            for is_mobile in (False, True):
+                row.label(text="", icon_value=projected.get_step(value_type, is_mobile).icon_id)
+
+
+class VRCToggleCandidate(bpy.types.Operator):
+    bl_idname = "vrc_perf.toggle_candidate"
+    bl_label = "Toggle Candidate"
+    bl_description = "Include this merge in the projected ranks. Nothing is changed in the file"
+    bl_options = {"INTERNAL"}
+
+    candidate: bpy.props.StringProperty()
+
+    def execute(self, context):
+        what_if_planner.toggle(self.candidate)
+        tag_redraw_sidebar()
+        return {"FINISHED"}
+
+
+class VRCExportReport(bpy.types.Operator, ExportHelper):
+    bl_idname = "vrc_perf.export_report"
+    bl_label = "Export Report"
+    bl_description = "Write the stats of every object of the selection and the rank summary to a file"
+
+    filename_ext = ".json"
+    filter_glob: bpy.props.StringProperty(default="*.json;*.csv", options={"HIDDEN"})
+
+    file_format: bpy.props.EnumProperty(
+        name="Format",
+        items=(
+            ("JSON", "JSON", "Rank summary and a list of objects"),
+            ("CSV", "CSV", "One row per object, the rank summary as # comment lines"),
+        ),
+        default="JSON",
+    )
+
+    def check(self, context):
+        # Keep the extension in line with the chosen format
+        root, extension = os.path.splitext(self.filepath)
+        if extension.lower() not in REPORT_EXTENSIONS.values():
+            root = self.filepath
+        filepath = root + REPORT_EXTENSIONS[self.file_format]
+        if filepath == self.filepath:
+            return False
+        self.filepath = filepath
+        return True
+
+    def execute(self, context):
+        settings = get_settings()
+        depsgraph = context.evaluated_depsgraph_get() if settings is not None and settings.count_evaluated else None
+        try:
+            row_count = export_report(self.filepath, file_format=self.file_format, depsgraph=depsgraph)
+        except (OSError, ValueError) as error:
+            self.report({"ERROR"}, f"Could not export the report: {error}")
+            return {"CANCELLED"}
+        self.report({"INFO"}, f"Exported {row_count} objects to {self.filepath}")
+        return {"FINISHED"}
+
+
+def get_rank_icon(rank):
+    return custom_icons[RANK_ICONS[rank]].icon_id if custom_icons is not None and rank is not None else 0
+
+
+class VRCHistory(bpy.types.Panel):
+    # Stats recorded on each save for the current selection, see PerfHistory
+
+    bl_label = "History"
+    bl_idname = "PT_VRCAR_HISTORY"
+    bl_parent_id = "PT_VRCAR"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "VRChat"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    # Saves listed, newest first
+    MAX_LISTED = 10
+
+    def draw(self, context):
+        layout = self.layout
+        if not bpy.data.filepath:
+            layout.label(text="Save the file to start the history")
+            return
+
+        name = stats_cache.object_name or ""
+        stored_name = PerfHistory.get_stored_name(name)
+        records = [record for record in perf_history.get_records(PerfHistory.get_path(bpy.data.filepath)) if record.name == stored_name]
+        if not records:
+            layout.label(text=f"No saves recorded for {name}")
+            return
+
+        # Trend from the first recorded save to the latest, PC values
+        first, latest = records[0], records[-1]
+        box = layout.box()
+        box.label(text=f"Since {strftime('%Y-%m-%d', localtime(first.timestamp))} ({len(records)} saves)")
+        for category, values in latest.values.items():
+            before = first.values.get(category, (float("nan"),))[0]
+            after = values[0]
+            if isinstance(before, float) and before != before:
+                continue
+            row = box.row(align=True)
+            row.label(text=f"{category}: {before:g} -> {after:g}", icon_value=get_rank_icon(latest.ranks[category][False]))
+
+        column = layout.column(align=True)
+        listed = 0
+        for index in range(len(records) - 1, -1, -1):
+            if listed == VRCHistory.MAX_LISTED:
+                break
+            listed += 1
+            record = records[index]
+            row = column.row(align=True)
+            row.label(text=strftime("%Y-%m-%d %H:%M", localtime(record.timestamp)))
+            for rank in record.worst:
+                row.label(text="", icon_value=get_rank_icon(rank))
+            if index == 0:
+                continue
+            # Flag the saves where a category changed rank
+            for category, is_mobile, before, after in record.get_rank_changes(records[index - 1]):
+                platform = "Mobile" if is_mobile else "PC"
+                worse = RANK_SEVERITY[after] > RANK_SEVERITY[before]
+                column.label(
+                    text=f"    {platform} {category}: {before.value} -> {after.value}",
+                    icon="ERROR" if worse else "CHECKMARK",
+                )
+
+
+class VRCRankDebug(bpy.types.Panel):
+    # Timings recorded by PerfStats, only shown while Performance Debug is enabled
+
+    bl_label = "Performance Debug"
+    bl_idname = "PT_VRCAR_DEBUG"
+    bl_parent_id = "PT_VRCAR"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "VRChat"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    @classmethod
+    def poll(cls, context):
+        return perf_stats.enabled
+
+    def draw(self, context):
+        layout = self.layout
+        column = layout.column(align=True)
+        for stage in PerfStats.STAGES:
+            timing = perf_stats.timings.get(stage)
+            if timing is None:
+                continue
+            row = column.row()
+            row.label(text=stage)
+            row.label(text=f"{timing.last * 1000:.2f} / {timing.total / timing.calls * 1000:.2f} ms")
+        for counter, amount in sorted(perf_stats.counters.items()):
+            row = column.row()
+            row.label(text=counter)
+            row.label(text=str(amount))
+
+        row = layout.row(align=True)
+        row.operator(VRCDumpPerfStats.bl_idname, icon="TEXT")
+        row.operator(VRCResetPerfStats.bl_idname, icon="LOOP_BACK")
+
+
+class VRCDumpPerfStats(bpy.types.Operator):
+    bl_idname = "vrc_perf.dump_debug"
+    bl_label = "Dump"
+    bl_description = "Write the recorded timings to the \"VRC Performance Debug\" text and the system console"
+
+    def execute(self, context):
+        report = "\n".join(perf_stats.get_report())
+        text = bpy.data.texts.get("VRC Performance Debug") or bpy.data.texts.new("VRC Performance Debug")
+        text.from_string(report)
+        print(report)
+        self.report({"INFO"}, "Timings written to the VRC Performance Debug text")
+        return {"FINISHED"}
+
+
+class VRCResetPerfStats(bpy.types.Operator):
+    bl_idname = "vrc_perf.reset_debug"
+    bl_label = "Reset"
+    bl_description = "Clear the recorded timings"
+
+    def execute(self, context):
+        perf_stats.reset()
+        return {"FINISHED"}
+
+class RankStep:
+    # One bucket of a rank table: the rank, the limit shown next to the value and the rank's icon
+
+    __slots__ = ("rank", "limit", "icon_id")
+
+    def __init__(self, rank, limit, icon_id=0):
+        self.rank = rank
+        self.limit = limit
+        self.icon_id = icon_id
+
+
+class RankTable:
+    # Precompiled thresholds per platform and ValueType. Each category is a sorted
+    # array of limits, so a single bisect finds the rank, icon and limit together.
+
+    def __init__(self, name, thresholds):
+        # thresholds: {is_mobile: {ValueType: [(Rank, limit), ...]}}
+        self.name = name
+        self.limits = {}
+        self.steps = {}
+        for is_mobile, categories in thresholds.items():
+            for value_type, ranks in categories.items():
+                ranks = sorted(ranks, key=lambda rank_limit: rank_limit[1])
+                limits = [limit for _, limit in ranks]
+                steps = [RankStep(rank, limit) for rank, limit in ranks]
+                # Anything above the last limit is Very Poor, still shown against the last limit
+                steps.append(RankStep(Rank.VERY_POOR, limits[-1]))
+                self.limits[is_mobile, value_type] = limits
+                self.steps[is_mobile, value_type] = steps
+        self.default_step = RankStep(Rank.EXCELLENT, 0)
+
+    def lookup(self, value_type: ValueType, count, mobile: bool) -> RankStep:
+        limits = self.limits.get((mobile, value_type))
+        if limits is None:
+            return self.default_step
+        return self.steps[mobile, value_type][bisect_left(limits, count)]
+
+    def set_icons(self, icons):
+        # Resolve the icon of every step once the preview icons are loaded
+        for step in self.all_steps():
+            step.icon_id = icons[RANK_ICONS[step.rank]].icon_id
+
+    def all_steps(self):
+        yield self.default_step
+        for steps in self.steps.values():
+            yield from steps
 
     @staticmethod
-    def get_bones_value(count: int, mobile: bool) -> int:
-        if mobile:
-            if count <= VRC_ANDROID_BONES_EXCELLENT:
-                return VRC_ANDROID_BONES_EXCELLENT
-            elif count <= VRC_ANDROID_BONES_GOOD:
-                return VRC_ANDROID_BONES_GOOD
-            else:
-                return VRC_ANDROID_BONES_MEDIUM
-        else:
-            if count <= VRC_PC_BONES_EXCELLENT:
-                return VRC_PC_BONES_EXCELLENT
-            elif count <= VRC_PC_BONES_GOOD:
-                return VRC_PC_BONES_GOOD
-            elif count <= VRC_PC_BONES_MEDIUM:
-                return VRC_PC_BONES_MEDIUM
-            else:
-                return VRC_PC_BONES_POOR
+    def from_profile(path):
+        # Profile layout: {"name": ..., "pc": {"Tris": {"Excellent": 32000, ...}, ...}, "mobile": {...}}
+        with open(path, encoding="utf-8") as file:
+            profile = json.load(file)
+
+        thresholds = {}
+        for is_mobile, platform in ((False, "pc"), (True, "mobile")):
+            categories = {}
+            for category, ranks in profile.get(platform, {}).items():
+                if ranks:
+                    categories[ValueType(category)] = [(Rank(rank), limit) for rank, limit in ranks.items()]
+            thresholds[is_mobile] = categories
+
+        return RankTable(profile.get("name", os.path.basename(path)), thresholds)
 
     @staticmethod
-    def get_default_value(count: int, mobile: bool) -> int:
-        return 0
+    def from_constants():
+        # Built-in fallback if no profile can be read
+        return RankTable("Built-in", {
+            False: {
+                ValueType.TRIS: [
+                    (Rank.EXCELLENT, VRC_PC_TRIS_EXCELLENT),
+                    (Rank.GOOD, VRC_PC_TRIS_GOOD),
+                ],
+                ValueType.SKINNED_MESH: [
+                    (Rank.EXCELLENT, VRC_PC_SKINNED_MESH_EXCELLENT),
+                    (Rank.GOOD, VRC_PC_SKINNED_MESH_GOOD),
+                    (Rank.MEDIUM, VRC_PC_SKINNED_MESH_MEDIUM),
+                    (Rank.POOR, VRC_PC_SKINNED_MESH_POOR),
+                ],
+                ValueType.BASIC_MESH: [
+                    (Rank.EXCELLENT, VRC_PC_BASIC_MESH_EXCELLENT),
+                    (Rank.GOOD, VRC_PC_BASIC_MESH_GOOD),
+                    (Rank.MEDIUM, VRC_PC_BASIC_MESH_MEDIUM),
+                    (Rank.POOR, VRC_PC_BASIC_MESH_POOR),
+                ],
+                ValueType.MATERIALS: [
+                    (Rank.EXCELLENT, VRC_PC_MATERIALS_EXCELLENT),
+                    (Rank.GOOD, VRC_PC_MATERIALS_GOOD),
+                    (Rank.MEDIUM, VRC_PC_MATERIALS_MEDIUM),
+                    (Rank.POOR, VRC_PC_MATERIALS_POOR),
+                ],
+                ValueType.BONES: [
+                    (Rank.EXCELLENT, VRC_PC_BONES_EXCELLENT),
+                    (Rank.GOOD, VRC_PC_BONES_GOOD),
+                    (Rank.MEDIUM, VRC_PC_BONES_MEDIUM),
+                    (Rank.POOR, VRC_PC_BONES_POOR),
+                ],
+                ValueType.TEXTURE_MEMORY: [
+                    (Rank.EXCELLENT, VRC_PC_TEXTURE_MEMORY_EXCELLENT),
+                    (Rank.GOOD, VRC_PC_TEXTURE_MEMORY_GOOD),
+                    (Rank.MEDIUM, VRC_PC_TEXTURE_MEMORY_MEDIUM),
+                    (Rank.POOR, VRC_PC_TEXTURE_MEMORY_POOR),
+                ],
+            },
+            True: {
+                ValueType.TRIS: [
+                    (Rank.EXCELLENT, VRC_ANDROID_TRIS_EXCELLENT),
+                    (Rank.GOOD, VRC_ANDROID_TRIS_GOOD),
+                    (Rank.MEDIUM, VRC_ANDROID_TRIS_MEDIUM),
+                    (Rank.POOR, VRC_ANDROID_TRIS_POOR),
+                ],
+                ValueType.SKINNED_MESH: [
+                    (Rank.EXCELLENT, VRC_ANDROID_SKINNED_MESH_EXCELLENT),
+                    (Rank.MEDIUM, VRC_ANDROID_SKINNED_MESH_MEDIUM),
+                ],
+                ValueType.BASIC_MESH: [
+                    (Rank.EXCELLENT, VRC_ANDROID_BASIC_MESH_EXCELLENT),
+                    (Rank.MEDIUM, VRC_ANDROID_BASIC_MESH_MEDIUM),
+                ],
+                ValueType.MATERIALS: [
+                    (Rank.EXCELLENT, VRC_ANDROID_MATERIALS_EXCELLENT),
+                    (Rank.MEDIUM, VRC_ANDROID_MATERIALS_MEDIUM),
+                    (Rank.POOR, VRC_ANDROID_MATERIALS_POOR),
+                ],
+                ValueType.BONES: [
+                    (Rank.EXCELLENT, VRC_ANDROID_BONES_EXCELLENT),
+                    (Rank.GOOD, VRC_ANDROID_BONES_GOOD),
+                    (Rank.MEDIUM, VRC_ANDROID_BONES_MEDIUM),
+                ],
+                ValueType.TEXTURE_MEMORY: [
+                    (Rank.EXCELLENT, VRC_ANDROID_TEXTURE_MEMORY_EXCELLENT),
+                    (Rank.GOOD, VRC_ANDROID_TEXTURE_MEMORY_GOOD),
+                    (Rank.MEDIUM, VRC_ANDROID_TEXTURE_MEMORY_MEDIUM),
+                    (Rank.POOR, VRC_ANDROID_TEXTURE_MEMORY_POOR),
+                ],
+            },
+        })
+
+
+# Position of each ValueType in the tuples of a RankResult
+VALUE_TYPE_INDEX = {value_type: index for index, value_type in enumerate(ValueType)}
+
+
+class RankResult:
+    # Ranks of one stats snapshot on both platforms: per category the value and its
+    # RankStep (rank, limit and icon), and the overall rank (worst category). Built
+    # once when the stats change, everything that shows or writes ranks reads it.
+    # The tuples are indexed by is_mobile, then by VALUE_TYPE_INDEX.
+
+    __slots__ = ("values", "steps", "worst", "used_bone_steps")
+
+    def __init__(self, measured_stats, table=None):
+        table = table or rank_table
+        values = []
+        steps = []
+        for is_mobile in (False, True):
+            platform_values = tuple(measured_stats.get(value_type, is_mobile) for value_type in ValueType)
+            values.append(platform_values)
+            steps.append(tuple(
+                table.lookup(value_type, value, is_mobile) for value_type, value in zip(ValueType, platform_values)
+            ))
+        self.values = tuple(values)
+        self.steps = tuple(steps)
+        self.worst = tuple(max(platform_steps, key=lambda step: RANK_SEVERITY[step.rank]) for platform_steps in self.steps)
+
+        # Bones rank after removing the unused ones, if they were looked for
+        self.used_bone_steps = None
+        if measured_stats.unused_bones:
+            used_bones = measured_stats.bone_count - len(measured_stats.unused_bones)
+            self.used_bone_steps = (table.lookup(ValueType.BONES, used_bones, False), table.lookup(ValueType.BONES, used_bones, True))
+
+    def get_value(self, value_type, is_mobile=False):
+        return self.values[is_mobile][VALUE_TYPE_INDEX[value_type]]
+
+    def get_step(self, value_type, is_mobile=False) -> RankStep:
+        return self.steps[is_mobile][VALUE_TYPE_INDEX[value_type]]
+
+    def get_worst(self, is_mobile=False) -> RankStep:
+        return self.worst[is_mobile]
+
+    def as_dict(self):
+        # Value and PC/Mobile rank of every category, as written to reports and audits
+        summary = {"stats": {}, "pc": {}, "mobile": {}}
+        for value_type, index in VALUE_TYPE_INDEX.items():
+            summary["stats"][value_type.value] = round(self.values[False][index], 2)
+            if value_type in PLATFORM_VALUE_TYPES:
+                summary["stats"][f"{value_type.value} (Mobile)"] = round(self.values[True][index], 2)
+            summary["pc"][value_type.value] = self.steps[False][index].rank.value
+            summary["mobile"][value_type.value] = self.steps[True][index].rank.value
+        summary["overall"] = {"pc": self.worst[False].rank.value, "mobile": self.worst[True].rank.value}
+        return summary
+
+
+BUNDLED_PROFILE = os.path.join(os.path.dirname(__file__), "profiles", "vrchat.json")
+
+rank_table = RankTable.from_constants()
+
+
+def load_rank_profile(path=None):
+    # Swap in the rank table of the given profile, the bundled one if no path is given
+    global rank_table
+    path = path or BUNDLED_PROFILE
+    try:
+        table = RankTable.from_profile(path)
+    except (OSError, ValueError, KeyError, AttributeError, IndexError, TypeError) as error:
+        print(f"Could not load rank profile {path}: {error}")
+        table = RankTable.from_profile(BUNDLED_PROFILE) if path != BUNDLED_PROFILE else RankTable.from_constants()
+
+    if custom_icons is not None:
+        table.set_icons(custom_icons)
+    rank_table = table
+    stats_cache.invalidate()
+    avatar_overview.invalidate_all()
+
+
+def on_rank_profile_changed(self, context):
+    load_rank_profile(bpy.path.abspath(self.rank_profile))
+
+
+def on_mobile_texture_format_changed(self, context):
+    texture_memory_index.set_mobile_format(self.mobile_texture_format)
+    stats_cache.invalidate()
+    avatar_overview.invalidate_all()
+
+
+def on_performance_debug_changed(self, context):
+    perf_stats.enabled = self.performance_debug
+    perf_stats.reset()
+
+
+class VRCPreferences(bpy.types.AddonPreferences):
+    bl_idname = __package__
+
+    rank_profile: bpy.props.StringProperty(
+        name="Rank Profile",
+        description="JSON file with the rank limits per platform. Leave empty to use the bundled VRChat limits",
+        subtype="FILE_PATH",
+        update=on_rank_profile_changed,
+    )
+
+    mobile_texture_format: bpy.props.EnumProperty(
+        name="Mobile Texture Format",
+        description="Compression the textures are assumed to use on Android, for the texture memory estimate",
+        items=(
+            ("ASTC_4x4", "ASTC 4x4", "Highest quality, 8 bits per pixel"),
+            ("ASTC_6x6", "ASTC 6x6", "Unity's default for Android, 3.56 bits per pixel"),
+            ("ASTC_8x8", "ASTC 8x8", "Smallest, 2 bits per pixel"),
+        ),
+        default="ASTC_6x6",
+        update=on_mobile_texture_format_changed,
+    )
+
+    performance_debug: bpy.props.BoolProperty(
+        name="Performance Debug",
+        description="Record timings of the rank panels and show them in a Performance Debug subpanel",
+        default=False,
+        update=on_performance_debug_changed,
+    )
+
+    def draw(self, context):
+        self.layout.prop(self, "rank_profile")
+        self.layout.label(text=f"Active: {rank_table.name}")
+        self.layout.prop(self, "mobile_texture_format")
+        self.layout.prop(self, "performance_debug")
+
+
+def get_preferences():
+    addon = bpy.context.preferences.addons.get(__package__)
+    return addon.preferences if addon is not None else None
+
 
 custom_icons = None
+
+classes = (
+    VRCPreferences,
+    VRCAvatarItem,
+    VRCSettings,
+    VRCRank,
+    VRCRankMobile,
+    VRCRankSettings,
+    VRCUnusedBones,
+    VRCWhatIf,
+    VRCToggleCandidate,
+    VRCExportReport,
+    VRCHistory,
+    VRCRankDebug,
+    VRCDumpPerfStats,
+    VRCResetPerfStats,
+    VRCAvatarList,
+    VRCOverview,
+    VRCRefreshOverview,
+)
         
 def register():
     global custom_icons
@@ -520,15 +2732,56 @@ def register():
     custom_icons.load("vrc_poor", os.path.join(icons_dir, "poor.png"), "IMAGE")
     custom_icons.load("vrc_verypoor", os.path.join(icons_dir, "verypoor.png"), "IMAGE")
 
-    bpy.utils.register_class(VRCRank)
-    bpy.utils.register_class(VRCRankMobile)
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    bpy.types.Scene.vrc_perf_settings = bpy.props.PointerProperty(type=VRCSettings)
+
+    preferences = get_preferences()
+    load_rank_profile(bpy.path.abspath(preferences.rank_profile) if preferences is not None else None)
+    perf_stats.enabled = preferences is not None and preferences.performance_debug
+    if preferences is not None:
+        texture_memory_index.set_mobile_format(preferences.mobile_texture_format)
+
+    bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update)
+    bpy.app.handlers.undo_post.append(on_undo_redo)
+    bpy.app.handlers.redo_post.append(on_undo_redo)
+    bpy.app.handlers.load_post.append(on_load_post)
+    bpy.app.handlers.save_post.append(on_save_post)
+    subscribe_selection_changes()
+    mesh_stat_index.clear()
+    texture_memory_index.clear()
+    bone_usage_index.clear()
+    hierarchy_index.clear()
+    collection_index.clear()
+    stats_cache.clear()
 
 
 def unregister():
     global custom_icons
+    bpy.msgbus.clear_by_owner(stats_cache)
+    bpy.app.handlers.save_post.remove(on_save_post)
+    bpy.app.handlers.load_post.remove(on_load_post)
+    bpy.app.handlers.redo_post.remove(on_undo_redo)
+    bpy.app.handlers.undo_post.remove(on_undo_redo)
+    bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update)
+    mesh_stat_index.clear()
+    texture_memory_index.clear()
+    bone_usage_index.clear()
+    hierarchy_index.clear()
+    collection_index.clear()
+    avatar_overview.clear()
+    what_if_planner.clear()
+    stats_cache.clear()
+    perf_stats.enabled = False
+    perf_stats.reset()
+    for timer in (run_stats_job, sync_avatar_items, record_pending_snapshot):
+        if bpy.app.timers.is_registered(timer):
+            bpy.app.timers.unregister(timer)
+
     bpy.utils.previews.remove(custom_icons)
-    bpy.utils.unregister_class(VRCRank)
-    bpy.utils.unregister_class(VRCRankMobile)
+    del bpy.types.Scene.vrc_perf_settings
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
 
 
 if __name__ == "__main__":
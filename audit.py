@@ -0,0 +1,390 @@
+#  Copyright (C) 2025 aoiyu_ <aoicsharp@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#  Description: Headless batch auditor. Ranks every avatar in a directory of
+#  .blend files using a pool of background Blender processes. Results are kept
+#  in a local SQLite cache so unchanged files are answered without Blender.
+#
+#  Usage:
+#    blender --background --python audit.py -- <directory> [options]
+#    python audit.py <directory> --blender <path to blender> [options]
+
+import argparse
+import ast
+import csv
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Marks result lines in the worker output, Blender prints plenty of its own
+RESULT_PREFIX = "VRCPV_RESULT "
+
+# Order of the categories in the CSV output
+CATEGORIES = ["Tris", "Skinned Mesh", "Basic Mesh", "Materials", "Bones", "Texture Memory"]
+# Stats that differ per platform get an extra column with the Mobile value
+MOBILE_STATS = ["Texture Memory"]
+# Bumped when the rows written by the worker change, so cached rows are redone
+ROW_FORMAT = 2
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Rule sets (profile, counting mode...) whose results are kept in the cache, the least
+# recently used ones beyond this are dropped
+CACHED_RULE_SETS = 8
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "vrchat_performance_viewer", "audit.sqlite")
+
+
+def in_blender():
+    try:
+        import bpy
+        return bpy.app.binary_path != ""
+    except ImportError:
+        return False
+
+
+def get_script_args():
+    # Blender passes script arguments after "--"
+    if "--" in sys.argv:
+        return sys.argv[sys.argv.index("--") + 1:]
+    return sys.argv[1:]
+
+
+def load_addon():
+    # Import the add-on from the directory this script lives in, without registering it
+    spec = importlib.util.spec_from_file_location(
+        "vrchat_performance_viewer",
+        os.path.join(ADDON_DIR, "__init__.py"),
+        submodule_search_locations=[ADDON_DIR],
+    )
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = addon
+    spec.loader.exec_module(addon)
+    return addon
+
+
+def make_row(addon, avatar_name, measured_stats):
+    row = {"avatar": avatar_name}
+    row.update(addon.RankResult(measured_stats).as_dict())
+    return row
+
+
+def run_worker(profile, evaluated):
+    # Runs inside a background Blender that has the .blend file to audit loaded
+    import bpy
+    addon = load_addon()
+    addon.load_rank_profile(profile)
+    depsgraph = bpy.context.evaluated_depsgraph_get() if evaluated else None
+
+    scene_objects = list(bpy.context.scene.objects)
+    roots = addon.VRCGlobalFunctions.find_avatar_roots(scene_objects)
+    rows = []
+    if roots:
+        for root in roots:
+            measured_stats = addon.VRCGlobalFunctions.collect_stats([root], False, depsgraph)
+            rows.append(make_row(addon, root.name, measured_stats))
+    else:
+        # No armature, treat the whole scene as a single avatar
+        top_level = [obj for obj in scene_objects if obj.parent is None]
+        measured_stats = addon.VRCGlobalFunctions.collect_stats(top_level, False, depsgraph)
+        rows.append(make_row(addon, bpy.context.scene.name, measured_stats))
+
+    for row in rows:
+        print(RESULT_PREFIX + json.dumps(row), flush=True)
+
+
+def audit_file(blender, path, timeout, profile, evaluated):
+    # Audit one file in its own Blender process and return its rows
+    command = [
+        blender,
+        "--background",
+        "--factory-startup",
+        "--disable-autoexec",
+        path,
+        "--python", os.path.abspath(__file__),
+        "--", "--worker",
+    ]
+    if profile:
+        command += ["--profile", profile]
+    if evaluated:
+        command.append("--evaluated")
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return [{"file": path, "error": f"Timed out after {timeout}s"}]
+
+    rows = []
+    for line in result.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            row = json.loads(line[len(RESULT_PREFIX):])
+            row["file"] = path
+            rows.append(row)
+
+    if not rows:
+        error = result.stderr.strip().splitlines()
+        return [{"file": path, "error": error[-1] if error else f"Blender exited with code {result.returncode}"}]
+    return rows
+
+
+def find_blend_files(directory, recursive):
+    paths = []
+    if recursive:
+        for root, _, files in os.walk(directory):
+            paths.extend(os.path.join(root, name) for name in files if name.endswith(".blend"))
+    else:
+        paths.extend(entry.path for entry in os.scandir(directory) if entry.is_file() and entry.name.endswith(".blend"))
+    return sorted(paths)
+
+
+class JsonLinesWriter:
+    # One JSON object per line, so results can be consumed while the audit runs
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, row):
+        self.stream.write(json.dumps(row) + "\n")
+        self.stream.flush()
+
+
+class CsvWriter:
+    # Flattened rows: stats, then PC ranks, then Mobile ranks per category
+
+    def __init__(self, stream):
+        self.stream = stream
+        fields = ["file", "avatar", "error"]
+        fields += [category for category in CATEGORIES]
+        fields += [f"{category} (Mobile)" for category in MOBILE_STATS]
+        fields += [f"PC {category}" for category in CATEGORIES]
+        fields += [f"Mobile {category}" for category in CATEGORIES]
+        fields += ["PC Overall", "Mobile Overall"]
+        self.writer = csv.DictWriter(stream, fieldnames=fields)
+        self.writer.writeheader()
+        self.stream.flush()
+
+    def write(self, row):
+        flat = {"file": row["file"], "avatar": row.get("avatar", ""), "error": row.get("error", "")}
+        for category in CATEGORIES:
+            flat[category] = row.get("stats", {}).get(category, "")
+            flat[f"PC {category}"] = row.get("pc", {}).get(category, "")
+            flat[f"Mobile {category}"] = row.get("mobile", {}).get(category, "")
+        for category in MOBILE_STATS:
+            flat[f"{category} (Mobile)"] = row.get("stats", {}).get(f"{category} (Mobile)", "")
+        flat["PC Overall"] = row.get("overall", {}).get("pc", "")
+        flat["Mobile Overall"] = row.get("overall", {}).get("mobile", "")
+        self.writer.writerow(flat)
+        self.stream.flush()
+
+
+def get_rules_fingerprint(profile, evaluated):
+    # Hash of everything the cached results depend on besides the file itself: the rank
+    # profile, the fallback threshold constants, the counting mode and the row format. The constants are
+    # read from the add-on source rather than imported, the add-on needs bpy and this
+    # may run in a plain Python.
+    with open(os.path.join(ADDON_DIR, "__init__.py"), encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+
+    constants = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if name.startswith(("VRC_PC_", "VRC_ANDROID_")) and isinstance(node.value, ast.Constant):
+                constants.append((name, node.value.value))
+
+    digest = hashlib.sha1(repr((sorted(constants), evaluated, ROW_FORMAT)).encode("utf-8"))
+    with open(profile or os.path.join(ADDON_DIR, "profiles", "vrchat.json"), "rb") as file:
+        digest.update(file.read())
+    return digest.hexdigest()
+
+
+def hash_file(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileKey:
+    # What a cached result is valid for
+
+    __slots__ = ("size", "mtime_ns", "digest")
+
+    def __init__(self, size, mtime_ns, digest):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+
+
+class AuditCache:
+    # Audit results per file and rule set, keyed by path, size, mtime and content hash.
+    # The content hash is only computed when size or mtime changed, so a file that
+    # was only touched is still answered from the cache.
+
+    def __init__(self, path, rules_fingerprint):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.rules = rules_fingerprint
+        self.connection = sqlite3.connect(path)
+        # Caches written before results were kept per rule set hold a single one, start over
+        self.connection.execute("DROP TABLE IF EXISTS meta")
+        self.connection.execute("DROP TABLE IF EXISTS files")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS rules (fingerprint TEXT PRIMARY KEY, used REAL)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "path TEXT, rules TEXT, size INTEGER, mtime_ns INTEGER, digest TEXT, rows TEXT, "
+            "PRIMARY KEY (path, rules))"
+        )
+
+        # Ranks depend on the thresholds and counting mode, so results are kept per rule
+        # set. Runs alternating between a few of them all stay cached, only rule sets
+        # that haven't been used for a while are dropped.
+        self.connection.execute("INSERT OR REPLACE INTO rules VALUES (?, ?)", (rules_fingerprint, time.time()))
+        obsolete = self.connection.execute(
+            "SELECT fingerprint FROM rules ORDER BY used DESC LIMIT -1 OFFSET ?", (CACHED_RULE_SETS,)
+        ).fetchall()
+        self.connection.executemany("DELETE FROM results WHERE rules = ?", obsolete)
+        self.connection.executemany("DELETE FROM rules WHERE fingerprint = ?", obsolete)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def lookup(self, path):
+        # Returns the cached rows or None, and the key to store a fresh result under
+        stat = os.stat(path)
+        entry = self.connection.execute(
+            "SELECT size, mtime_ns, digest, rows FROM results WHERE path = ? AND rules = ?", (path, self.rules)
+        ).fetchone()
+
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return json.loads(entry[3]), FileKey(stat.st_size, stat.st_mtime_ns, entry[2])
+
+        key = FileKey(stat.st_size, stat.st_mtime_ns, hash_file(path))
+        if entry is not None and entry[0] == key.size and entry[2] == key.digest:
+            self.connection.execute(
+                "UPDATE results SET mtime_ns = ? WHERE path = ? AND rules = ?", (key.mtime_ns, path, self.rules)
+            )
+            self.connection.commit()
+            return json.loads(entry[3]), key
+
+        return None, key
+
+    def store(self, path, key, rows):
+        if any("error" in row for row in rows):
+            return
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+            (path, self.rules, key.size, key.mtime_ns, key.digest, json.dumps(rows)),
+        )
+        self.connection.commit()
+
+    def evict_missing(self):
+        # Forget files that were deleted or moved
+        paths = [entry[0] for entry in self.connection.execute("SELECT DISTINCT path FROM results")]
+        missing = [(path,) for path in paths if not os.path.isfile(path)]
+        self.connection.executemany("DELETE FROM results WHERE path = ?", missing)
+        self.connection.commit()
+
+
+def run_audit(paths, blender, jobs, timeout, writer, cache=None, profile=None, evaluated=False):
+    # Cached files are written right away. Each worker thread just waits on its own
+    # Blender process, so the pool size is the number of Blender processes running
+    # at once. Rows are written as soon as their file finishes.
+    pending = []
+    for path in paths:
+        if cache is None:
+            pending.append((path, None))
+            continue
+        rows, key = cache.lookup(path)
+        if rows is None:
+            pending.append((path, key))
+            continue
+        for row in rows:
+            writer.write(row)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(audit_file, blender, path, timeout, profile, evaluated): (path, key) for path, key in pending}
+        for future in as_completed(futures):
+            rows = future.result()
+            for row in rows:
+                writer.write(row)
+            if cache is not None:
+                path, key = futures[future]
+                cache.store(path, key, rows)
+
+
+def find_blender(path):
+    if path:
+        return path
+    if in_blender():
+        import bpy
+        return bpy.app.binary_path
+    return shutil.which("blender")
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Rank every avatar in a directory of .blend files.")
+    parser.add_argument("directory", help="Directory to scan for .blend files")
+    parser.add_argument("--recursive", "-r", action="store_true", help="Also scan subdirectories")
+    parser.add_argument("--format", choices=["json", "csv"], default="json", help="Output format (JSON Lines or CSV)")
+    parser.add_argument("--output", "-o", help="Output file, defaults to stdout")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="Number of Blender processes to run at once")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds before a single file is given up on")
+    parser.add_argument("--blender", help="Blender executable, defaults to the running Blender or the one on PATH")
+    parser.add_argument("--profile", help="Rank profile JSON, defaults to the bundled VRChat limits")
+    parser.add_argument("--evaluated", action="store_true", help="Count tris after modifiers")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Result cache database")
+    parser.add_argument("--no-cache", action="store_true", help="Audit every file, without reading or writing the cache")
+    return parser.parse_args(args)
+
+
+def main():
+    args = get_script_args()
+    if "--worker" in args:
+        run_worker(args[args.index("--profile") + 1] if "--profile" in args else None, "--evaluated" in args)
+        return
+
+    options = parse_args(args)
+    profile = os.path.abspath(options.profile) if options.profile else None
+    blender = find_blender(options.blender)
+    if blender is None:
+        sys.exit("Blender executable not found, pass it with --blender.")
+
+    paths = [os.path.abspath(path) for path in find_blend_files(options.directory, options.recursive)]
+    cache = None
+    if not options.no_cache:
+        cache = AuditCache(options.cache, get_rules_fingerprint(profile, options.evaluated))
+        cache.evict_missing()
+
+    stream = open(options.output, "w", newline="", encoding="utf-8") if options.output else sys.stdout
+    try:
+        writer = JsonLinesWriter(stream) if options.format == "json" else CsvWriter(stream)
+        run_audit(paths, blender, max(1, options.jobs), options.timeout, writer, cache, profile, options.evaluated)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+        if cache is not None:
+            cache.close()
+
+
+if __name__ == "__main__":
+    main()
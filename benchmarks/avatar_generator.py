@@ -0,0 +1,201 @@
+#  Copyright (C) 2025 aoiyu_ <aoicsharp@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#  Description: Builds synthetic avatars (an armature with skinned meshes) for
+#  the benchmarks, either in a real Blender or in the fake_bpy stand-in.
+
+import random
+from dataclasses import dataclass, asdict
+
+import bpy
+
+
+@dataclass
+class AvatarConfig:
+    mesh_count: int = 40
+    polygons_per_mesh: int = 2500
+    # Share of polygons that are n-gons (5 to 8 sides), the rest are quads
+    ngon_ratio: float = 0.1
+    bone_count: int = 150
+    # Bone weights per vertex, 0 to leave the meshes unweighted
+    vertex_weights: int = 0
+    # Bones at the end of the list that no vertex is weighted to
+    unused_bones: int = 0
+    # Shape keys per mesh including the basis, 0 for none
+    shape_keys: int = 0
+    # Meshes that are linked duplicates of another mesh's data
+    linked_duplicates: int = 0
+    materials_per_mesh: int = 1
+    # Image textures per material and their size in pixels
+    textures_per_material: int = 0
+    texture_size: int = 1024
+    seed: int = 0
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def get_polygon_sizes(config, rng):
+    sizes = []
+    for _ in range(config.polygons_per_mesh):
+        sizes.append(rng.randint(5, 8) if rng.random() < config.ngon_ratio else 4)
+    return sizes
+
+
+def new_images(config, material_name):
+    # Every other texture has an alpha channel, like a base color and a normal map
+    return [
+        bpy.data.images.new(f"{material_name} Texture {index}", config.texture_size, config.texture_size, alpha=index % 2 == 0)
+        for index in range(config.textures_per_material)
+    ]
+
+
+def is_standin():
+    return getattr(bpy.app, "version_string", "") == "stand-in"
+
+
+def generate_avatar(config: AvatarConfig, name="Avatar"):
+    # Returns the armature object, every mesh is parented to it
+    rng = random.Random(config.seed)
+    if is_standin():
+        return generate_standin_avatar(config, name, rng)
+    return generate_blender_avatar(config, name, rng)
+
+
+def generate_standin_avatar(config, name, rng):
+    from fake_bpy import Bone, Key, MaterialSlot, Modifier, Node, NodeTree, Vertex, VertexGroup, VertexGroupElement
+
+    scene = bpy.context.scene
+    armature_data = bpy.data.armatures.new(f"{name} Armature")
+    parent = None
+    for index in range(config.bone_count):
+        bone = Bone(f"Bone {index}", parent)
+        armature_data.bones.append(bone)
+        parent = bone if index % 10 else armature_data.bones[0]
+    armature = bpy.data.objects.new(name, armature_data)
+    weighted_bones = max(1, config.bone_count - config.unused_bones)
+    scene.collection.objects.link(armature)
+
+    materials = [bpy.data.materials.new(f"{name} Material {index}") for index in range(config.materials_per_mesh)]
+    for material in materials:
+        material.use_nodes = True
+        material.node_tree = NodeTree(f"{material.name} Nodes")
+        for image in new_images(config, material.name):
+            material.node_tree.nodes.append(Node("TEX_IMAGE", image))
+
+    unique_meshes = []
+    for index in range(config.mesh_count):
+        if index >= config.mesh_count - config.linked_duplicates and unique_meshes:
+            mesh = rng.choice(unique_meshes)
+        else:
+            mesh = bpy.data.meshes.new(f"{name} Mesh {index}", get_polygon_sizes(config, rng), len(materials))
+            if config.shape_keys:
+                mesh.shape_keys = Key(f"{name} Key {index}", config.shape_keys)
+            if config.vertex_weights:
+                mesh.vertices = [
+                    Vertex(VertexGroupElement(rng.randrange(weighted_bones), 1.0 / config.vertex_weights)
+                           for _ in range(config.vertex_weights))
+                    for _ in range(len(mesh.vertices))
+                ]
+            unique_meshes.append(mesh)
+
+        obj = bpy.data.objects.new(f"{name} Mesh {index}", mesh)
+        if config.vertex_weights:
+            obj.vertex_groups = [VertexGroup(bone.name, bone_index) for bone_index, bone in enumerate(armature_data.bones)]
+        obj.slot_links = [MaterialSlot(material) for material in materials]
+        obj.parent = armature
+        obj.modifiers.append(Modifier("Armature", "ARMATURE", armature))
+        scene.collection.objects.link(obj)
+
+    return armature
+
+
+def generate_blender_avatar(config, name, rng):
+    scene = bpy.context.scene
+
+    armature_data = bpy.data.armatures.new(f"{name} Armature")
+    armature = bpy.data.objects.new(name, armature_data)
+    scene.collection.objects.link(armature)
+    bpy.context.view_layer.objects.active = armature
+    bpy.ops.object.mode_set(mode="EDIT")
+    root = None
+    parent = None
+    for index in range(config.bone_count):
+        bone = armature_data.edit_bones.new(f"Bone {index}")
+        bone.head = (0.0, 0.0, index * 0.01)
+        bone.tail = (0.0, 0.01, index * 0.01)
+        bone.parent = parent
+        root = root or bone
+        parent = bone if index % 10 else root
+    bpy.ops.object.mode_set(mode="OBJECT")
+
+    materials = [bpy.data.materials.new(f"{name} Material {index}") for index in range(config.materials_per_mesh)]
+    for material in materials:
+        material.use_nodes = True
+        for image in new_images(config, material.name):
+            node = material.node_tree.nodes.new("ShaderNodeTexImage")
+            node.image = image
+
+    unique_meshes = []
+    for index in range(config.mesh_count):
+        if index >= config.mesh_count - config.linked_duplicates and unique_meshes:
+            mesh = rng.choice(unique_meshes)
+        else:
+            mesh = build_blender_mesh(f"{name} Mesh {index}", get_polygon_sizes(config, rng))
+            for material in materials:
+                mesh.materials.append(material)
+            unique_meshes.append(mesh)
+
+        obj = bpy.data.objects.new(f"{name} Mesh {index}", mesh)
+        scene.collection.objects.link(obj)
+        obj.parent = armature
+        modifier = obj.modifiers.new("Armature", "ARMATURE")
+        modifier.object = armature
+        if config.vertex_weights:
+            add_blender_weights(config, obj, armature_data, rng)
+        if config.shape_keys and mesh.shape_keys is None:
+            for key_index in range(config.shape_keys):
+                obj.shape_key_add(name=f"Key {key_index}")
+
+    return armature
+
+
+def add_blender_weights(config, obj, armature_data, rng):
+    # One vertex group per bone, each vertex gets weights from random weighted bones
+    weighted_bones = max(1, config.bone_count - config.unused_bones)
+    groups = [obj.vertex_groups.new(name=bone.name) for bone in armature_data.bones]
+    members = [[] for _ in groups]
+    for vertex_index in range(len(obj.data.vertices)):
+        for _ in range(config.vertex_weights):
+            members[rng.randrange(weighted_bones)].append(vertex_index)
+    for group, indices in zip(groups, members):
+        if indices:
+            group.add(indices, 1.0 / config.vertex_weights, "ADD")
+
+
+def build_blender_mesh(name, polygon_sizes):
+    # Disconnected polygons laid out on a line, the topology is all that matters here
+    vertices = []
+    faces = []
+    for polygon_index, size in enumerate(polygon_sizes):
+        start = len(vertices)
+        for corner in range(size):
+            vertices.append((polygon_index * 2.0 + corner * 0.1, (corner % 2) * 0.1, 0.0))
+        faces.append(tuple(range(start, start + size)))
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(vertices, [], faces)
+    mesh.update()
+    return mesh
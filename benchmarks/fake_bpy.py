@@ -0,0 +1,532 @@
+#  Copyright (C) 2025 aoiyu_ <aoicsharp@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#  Description: Minimal pure-Python stand-in for the parts of bpy the add-on
+#  uses, so the benchmarks can run on a machine without Blender. Only the
+#  behaviour the add-on relies on is modelled: collection lengths are O(1) like
+#  in RNA, everything else is plain attributes.
+
+import sys
+import types
+from itertools import count
+
+_session_uids = count(1)
+
+
+class _Property:
+    # Stand-in for bpy.props.*Property, keeps the default for register_class
+
+    def __init__(self, default=None, **kwargs):
+        self.default = default
+        self.kwargs = kwargs
+
+
+class _PointerProperty:
+    # Stand-in for a PointerProperty added to an ID type, one instance per ID
+
+    def __init__(self, type=None, **kwargs):
+        self.type = type
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        # Assigned to the ID type after class creation, so keyed by the property itself
+        pointers = instance.__dict__.setdefault("_pointers", {})
+        value = pointers.get(self)
+        if value is None:
+            value = pointers[self] = self.type()
+        return value
+
+
+class _CollectionValue(list):
+    # Stand-in for a CollectionProperty value
+
+    def __init__(self, item_type):
+        super().__init__()
+        self.item_type = item_type
+
+    def add(self):
+        item = self.item_type()
+        self.append(item)
+        return item
+
+    def remove(self, index):
+        del self[index]
+
+
+class _CollectionProperty(_Property):
+    def __init__(self, type=None, **kwargs):
+        super().__init__(None, **kwargs)
+        self.type = type
+
+
+def _apply_annotations(cls):
+    # Turn property annotations into plain attributes holding their defaults
+    for name, prop in getattr(cls, "__annotations__", {}).items():
+        if isinstance(prop, _CollectionProperty):
+            item_type = prop.type
+
+            def make_collection(self, name=name, item_type=item_type):
+                value = self.__dict__.get(name)
+                if value is None:
+                    value = self.__dict__[name] = _CollectionValue(item_type)
+                return value
+
+            setattr(cls, name, property(make_collection))
+        elif isinstance(prop, _Property):
+            setattr(cls, name, prop.default)
+
+
+class _Sized:
+    # A collection that only knows its length, like a large RNA collection read via len()
+
+    def __init__(self, length):
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+
+class _Vertices(_Sized):
+    # Vertices of a mesh without weights, iterating them yields empty vertices
+
+    def __iter__(self):
+        vertex = Vertex()
+        for _ in range(self.length):
+            yield vertex
+
+
+class ID:
+    def __init__(self, name):
+        self.name = name
+        self.name_full = name
+        self.session_uid = next(_session_uids)
+        self.users = 0
+
+    @property
+    def original(self):
+        return self
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name!r}>"
+
+
+class Mesh(ID):
+    def __init__(self, name, polygon_sizes=(), material_count=0):
+        super().__init__(name)
+        self.polygon_sizes = list(polygon_sizes)
+        self.polygons = _Sized(len(self.polygon_sizes))
+        self.loops = _Sized(sum(self.polygon_sizes))
+        self.vertices = _Vertices(sum(self.polygon_sizes))
+        self.materials = [None] * material_count
+        self.shape_keys = None
+        self.is_editmode = False
+
+
+class VertexGroupElement:
+    __slots__ = ("group", "weight")
+
+    def __init__(self, group, weight):
+        self.group = group
+        self.weight = weight
+
+
+class Vertex:
+    __slots__ = ("groups",)
+
+    def __init__(self, groups=()):
+        self.groups = list(groups)
+
+
+class VertexGroup:
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+
+
+class _BMFace:
+    __slots__ = ("verts",)
+
+    def __init__(self, size):
+        self.verts = _Sized(size)
+
+
+class _BMesh:
+    # Stand-in for the edit BMesh of a mesh, built from its polygon sizes
+    def __init__(self, mesh):
+        self.faces = [_BMFace(size) for size in mesh.polygon_sizes]
+        self.verts = _Sized(len(mesh.vertices))
+        self.edges = _Sized(sum(mesh.polygon_sizes))
+
+
+class Key(ID):
+    def __init__(self, name, key_block_count):
+        super().__init__(name)
+        self.key_blocks = [types.SimpleNamespace(name=f"Key {index}") for index in range(key_block_count)]
+
+
+class Bone:
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.children = []
+        if parent is not None:
+            parent.children.append(self)
+
+
+class PoseBone:
+    def __init__(self, name):
+        self.name = name
+        self.constraints = []
+
+
+class Armature(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.bones = []
+
+
+class Material(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.node_tree = None
+        self.use_nodes = False
+
+
+class Modifier:
+    def __init__(self, name, type, object=None):
+        self.name = name
+        self.type = type
+        self.object = object
+
+
+class MaterialSlot:
+    def __init__(self, material=None):
+        self.material = material
+
+
+class Object(ID):
+    def __init__(self, name, data=None):
+        super().__init__(name)
+        self.data = data
+        if isinstance(data, Mesh):
+            self.type = "MESH"
+        elif isinstance(data, Armature):
+            self.type = "ARMATURE"
+        else:
+            self.type = "EMPTY"
+        self.parent = None
+        self.parent_type = "OBJECT"
+        self.pose = types.SimpleNamespace(bones=[PoseBone(bone.name) for bone in data.bones]) if self.type == "ARMATURE" else None
+        self.modifiers = []
+        self.vertex_groups = []
+        self.hide_viewport = False
+        self.hidden = False
+        self.mode = "OBJECT"
+        self.selected = False
+        self.slot_links = [MaterialSlot(material) for material in getattr(data, "materials", [])]
+
+    @property
+    def material_slots(self):
+        return self.slot_links
+
+    @property
+    def children(self):
+        return [obj for obj in sys.modules["bpy"].data.objects if obj.parent is self]
+
+    @property
+    def children_recursive(self):
+        result = []
+        for child in self.children:
+            result.append(child)
+            result.extend(child.children_recursive)
+        return result
+
+    def hide_get(self):
+        return self.hidden
+
+    def visible_get(self):
+        return not self.hidden and not self.hide_viewport
+
+    def select_get(self):
+        return self.selected
+
+    def select_set(self, state):
+        self.selected = state
+
+    def evaluated_get(self, depsgraph):
+        return self
+
+    def to_mesh(self):
+        return self.data
+
+    def to_mesh_clear(self):
+        pass
+
+
+class Collection(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.objects = _IDCollection(Object)
+        self.children = _IDCollection(Collection)
+        self.hide_viewport = False
+
+    @property
+    def all_objects(self):
+        result = list(self.objects)
+        seen = set(id(obj) for obj in result)
+        for child in self.children:
+            for obj in child.all_objects:
+                if id(obj) not in seen:
+                    seen.add(id(obj))
+                    result.append(obj)
+        return result
+
+
+class Scene(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.collection = Collection("Scene Collection")
+
+    @property
+    def objects(self):
+        return self.collection.all_objects
+
+
+class Image(ID):
+    def __init__(self, name, width=0, height=0, alpha=False):
+        super().__init__(name)
+        self.source = "GENERATED"
+        self.generated_width = width
+        self.generated_height = height
+        self.size = (width, height)
+        self.channels = 4
+        self.alpha_mode = "STRAIGHT" if alpha else "NONE"
+        self.filepath = ""
+        self.packed_file = None
+        self.library = None
+
+
+class Node:
+    def __init__(self, type, image=None, node_tree=None):
+        self.type = type
+        self.image = image
+        self.node_tree = node_tree
+
+
+class NodeTree(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.nodes = []
+
+
+class Text(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.body = ""
+
+    def from_string(self, text):
+        self.body = text
+
+    def as_string(self):
+        return self.body
+
+
+class _IDCollection(list):
+    # Stand-in for bpy.data.* and Collection.objects
+
+    def __init__(self, id_type):
+        super().__init__()
+        self.id_type = id_type
+
+    def new(self, name, *args, **kwargs):
+        item = self.id_type(name, *args, **kwargs)
+        self.append(item)
+        return item
+
+    def link(self, item):
+        if item not in self:
+            self.append(item)
+
+    def unlink(self, item):
+        self.remove(item)
+
+    def get(self, name, default=None):
+        for item in self:
+            if item.name == name:
+                return item
+        return default
+
+
+class _Struct:
+    # Base for registrable classes (Panel, Operator, PropertyGroup...)
+    pass
+
+
+class _LayerCollection:
+    def __init__(self, collection):
+        self.collection = collection
+        self.children = [_LayerCollection(child) for child in collection.children]
+        self.exclude = False
+        self.hide_viewport = False
+
+
+class _Handlers:
+    def __init__(self):
+        for name in ("depsgraph_update_post", "undo_post", "redo_post", "load_post", "save_pre", "save_post"):
+            setattr(self, name, [])
+
+    @staticmethod
+    def persistent(function):
+        return function
+
+
+class _Timers:
+    def __init__(self):
+        self.registered = []
+
+    def register(self, function, first_interval=0, persistent=False):
+        self.registered.append(function)
+
+    def unregister(self, function):
+        self.registered.remove(function)
+
+    def is_registered(self, function):
+        return function in self.registered
+
+    def run_all(self):
+        # Call the registered timers until all of them are done
+        while self.registered:
+            for function in list(self.registered):
+                if function() is None:
+                    self.registered.remove(function)
+
+
+class _Previews(dict):
+    def load(self, name, path, path_type):
+        self[name] = types.SimpleNamespace(icon_id=len(self) + 1)
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+def reset():
+    # Empty the stand-in file, like loading the factory startup
+    bpy = sys.modules["bpy"]
+    scene = Scene("Scene")
+    bpy.data.objects = _IDCollection(Object)
+    bpy.data.meshes = _IDCollection(Mesh)
+    bpy.data.armatures = _IDCollection(Armature)
+    bpy.data.materials = _IDCollection(Material)
+    bpy.data.collections = _IDCollection(Collection)
+    bpy.data.images = _IDCollection(Image)
+    bpy.data.texts = _IDCollection(Text)
+    bpy.data.scenes = _IDCollection(Scene)
+    bpy.data.scenes.append(scene)
+    bpy.data.filepath = ""
+
+    view_layer = types.SimpleNamespace(active_layer_collection=_LayerCollection(scene.collection), objects=None)
+    bpy.context.scene = scene
+    bpy.context.view_layer = view_layer
+    return scene
+
+
+def install():
+    # Register the stand-in as `bpy` (and its submodules) in sys.modules
+    handlers = _Handlers()
+    app = _module(
+        "bpy.app",
+        handlers=handlers,
+        timers=_Timers(),
+        background=True,
+        binary_path="",
+        version=(4, 2, 0),
+        version_string="stand-in",
+    )
+    sys.modules["bpy.app.handlers"] = handlers
+
+    registrable = {
+        name: type(name, (_Struct,), {})
+        for name in ("Panel", "Operator", "PropertyGroup", "AddonPreferences", "UIList", "Menu")
+    }
+    bpy_types = _module(
+        "bpy.types",
+        ID=ID,
+        Object=Object,
+        Mesh=Mesh,
+        Armature=Armature,
+        Material=Material,
+        Collection=Collection,
+        Scene=Scene,
+        Image=Image,
+        Text=Text,
+        Key=Key,
+        NodeTree=NodeTree,
+        LayerObjects=type("LayerObjects", (), {}),
+        ViewLayer=type("ViewLayer", (), {}),
+        LayerCollection=_LayerCollection,
+        **registrable,
+    )
+
+    def register_class(cls):
+        _apply_annotations(cls)
+
+    previews = _module("bpy.utils.previews", new=_Previews, remove=lambda previews: None)
+    utils = _module("bpy.utils", register_class=register_class, unregister_class=lambda cls: None, previews=previews)
+
+    props = _module(
+        "bpy.props",
+        BoolProperty=_Property,
+        IntProperty=_Property,
+        FloatProperty=_Property,
+        StringProperty=_Property,
+        EnumProperty=_Property,
+        PointerProperty=_PointerProperty,
+        CollectionProperty=_CollectionProperty,
+    )
+
+    _module("bmesh", from_edit_mesh=_BMesh)
+    io_utils = _module("bpy_extras.io_utils", ExportHelper=type("ExportHelper", (), {}))
+    _module("bpy_extras", io_utils=io_utils)
+    msgbus = _module("bpy.msgbus", subscribe_rna=lambda **kwargs: None, clear_by_owner=lambda owner: None)
+    path = _module("bpy.path", abspath=lambda path, library=None: path)
+
+    context = types.SimpleNamespace(
+        selected_objects=[],
+        scene=None,
+        view_layer=None,
+        preferences=types.SimpleNamespace(addons={}),
+        window_manager=types.SimpleNamespace(windows=[]),
+        evaluated_depsgraph_get=lambda: None,
+    )
+
+    bpy = _module(
+        "bpy",
+        app=app,
+        types=bpy_types,
+        utils=utils,
+        props=props,
+        msgbus=msgbus,
+        path=path,
+        context=context,
+        data=types.SimpleNamespace(),
+        ops=types.SimpleNamespace(),
+    )
+    reset()
+    return bpy
@@ -0,0 +1,195 @@
+#  Copyright (C) 2025 aoiyu_ <aoicsharp@outlook.com>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#  Description: Times the draw path, stat collection and ranking on a synthetic
+#  avatar and writes the results as JSON.
+#
+#  Usage:
+#    blender --background --factory-startup --python benchmarks/run_benchmarks.py -- [options]
+#    python benchmarks/run_benchmarks.py [options]      (uses the bpy stand-in)
+
+import argparse
+import dataclasses
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+from time import perf_counter
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+try:
+    import bpy
+except ImportError:
+    import fake_bpy
+    bpy = fake_bpy.install()
+
+from avatar_generator import AvatarConfig, generate_avatar, is_standin
+
+
+class RecordingLayout:
+    # Stands in for UILayout so the draw path can run without a UI
+
+    def __init__(self):
+        self.calls = 0
+
+    def row(self, **kwargs):
+        self.calls += 1
+        return self
+
+    def column(self, **kwargs):
+        self.calls += 1
+        return self
+
+    def split(self, **kwargs):
+        self.calls += 1
+        return self
+
+    def label(self, **kwargs):
+        self.calls += 1
+
+    def progress(self, **kwargs):
+        self.calls += 1
+
+    def prop(self, *args, **kwargs):
+        self.calls += 1
+
+    def operator(self, *args, **kwargs):
+        self.calls += 1
+
+
+def load_addon():
+    spec = importlib.util.spec_from_file_location(
+        "vrchat_performance_viewer",
+        os.path.join(ADDON_DIR, "__init__.py"),
+        submodule_search_locations=[ADDON_DIR],
+    )
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = addon
+    spec.loader.exec_module(addon)
+    return addon
+
+
+def measure(function, repeats, setup=None):
+    # Milliseconds per call, setup is run before every call and not timed
+    samples = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        function()
+        samples.append((perf_counter() - start) * 1000)
+    return {
+        "repeats": repeats,
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "max_ms": max(samples),
+    }
+
+
+def select_only(objects):
+    if is_standin():
+        for obj in bpy.data.objects:
+            obj.select_set(obj in objects)
+        bpy.context.selected_objects = list(objects)
+    else:
+        for obj in bpy.context.view_layer.objects:
+            obj.select_set(obj in objects)
+
+
+def run(config, repeats):
+    addon = load_addon()
+    addon.load_rank_profile()
+
+    start = perf_counter()
+    armature = generate_avatar(config)
+    generation_ms = (perf_counter() - start) * 1000
+    select_only([armature])
+
+    def clear_caches():
+        addon.mesh_stat_index.clear()
+        addon.texture_memory_index.clear()
+        addon.bone_usage_index.clear()
+        addon.hierarchy_index.clear()
+        addon.stats_cache.clear()
+
+    def collect_stats():
+        addon.VRCGlobalFunctions.collect_stats([armature], False)
+
+    measured_stats = addon.VRCGlobalFunctions.collect_stats([armature], False)
+
+    def find_unused_bones():
+        addon.VRCGlobalFunctions.collect_stats([armature], False, analyze_bones=True)
+
+    def rank_all():
+        addon.RankResult(measured_stats)
+
+    def draw_both_panels():
+        addon.VRCGlobalFunctions.determine_draw_path(RecordingLayout(), False)
+        addon.VRCGlobalFunctions.determine_draw_path(RecordingLayout(), True)
+
+    results = {
+        "collect_stats_cold": measure(collect_stats, repeats, clear_caches),
+        "collect_stats_warm": measure(collect_stats, repeats),
+        "unused_bones_cold": measure(find_unused_bones, repeats, addon.bone_usage_index.clear),
+        "unused_bones_warm": measure(find_unused_bones, repeats),
+        "ranking": measure(rank_all, repeats),
+        "draw_path_cold": measure(draw_both_panels, repeats, clear_caches),
+        "draw_path_dirty": measure(draw_both_panels, repeats, addon.stats_cache.invalidate),
+        "draw_path_cached": measure(draw_both_panels, repeats),
+    }
+
+    return {
+        "backend": "stand-in" if is_standin() else "blender",
+        "blender_version": bpy.app.version_string if hasattr(bpy.app, "version_string") else None,
+        "addon_version": ".".join(str(part) for part in addon.bl_info["version"]),
+        "python_version": platform.python_version(),
+        "config": config.as_dict(),
+        "generation_ms": generation_ms,
+        "stats": {value_type.value: measured_stats.get(value_type) for value_type in addon.ValueType},
+        "results": results,
+    }
+
+
+def parse_args():
+    args = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description="Benchmark the VRChat Performance Viewer draw path.")
+    for field in dataclasses.fields(AvatarConfig):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=field.type, default=field.default)
+    parser.add_argument("--repeats", type=int, default=20, help="Timed calls per benchmark")
+    parser.add_argument("--output", "-o", help="Write the JSON results here instead of stdout")
+    return parser.parse_args(args)
+
+
+def main():
+    options = parse_args()
+    config = AvatarConfig(**{field.name: getattr(options, field.name) for field in dataclasses.fields(AvatarConfig)})
+    report = run(config, options.repeats)
+
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()